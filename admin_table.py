@@ -0,0 +1,130 @@
+# ============================================================
+# admin_table.py
+# ------------------------------------------------------------
+# Tabela "Imóveis cadastrados" do admin (/admin e /admin/edit/<id>).
+#
+# Uma consulta por página: colunas da tabela + id da capa
+# (Imovel.capa_foto_id) + quantidade de fotos (subquery correlacionada),
+# com LIMIT/OFFSET. Abrir um imóvel para edição custa uma página, não o
+# catálogo inteiro.
+#
+# Parâmetros (querystring): q, status, finalidade, tipo, bairro,
+# sort (id|codigo|tipo|bairro|valor|status|fotos), dir (asc|desc), page.
+# Com q e sem sort, a ordem é a relevância do índice de busca.
+# ============================================================
+
+from urllib.parse import urlencode
+
+import search_index
+from models import db, Imovel, ImovelFoto
+
+PAGE_SIZE = 50
+DESCRICAO_CHARS = 400   # a célula mostra 4 linhas (line-clamp-4)
+
+n_fotos = (
+    db.select(db.func.count(ImovelFoto.id))
+    .where(ImovelFoto.imovel_id == Imovel.id)
+    .correlate_except(ImovelFoto)
+    .scalar_subquery()
+    .label("n_fotos")
+)
+
+SORTS = {
+    "id": Imovel.id,
+    "codigo": Imovel.codigo,
+    "tipo": Imovel.tipo,
+    "bairro": Imovel.bairro,
+    "valor": Imovel.valor,
+    "status": Imovel.status,
+    "fotos": n_fotos,
+}
+
+PARAMS = ("q", "status", "finalidade", "tipo", "bairro", "sort", "dir", "page")
+
+
+class Pagina:
+    """Linhas de uma página da tabela + estado para montar os links."""
+
+    def __init__(self, linhas, args: dict, page: int, has_next: bool):
+        self.linhas = linhas
+        self.args = args
+        self.page = page
+        self.has_prev = page > 1
+        self.has_next = has_next
+
+    def qs(self, **mudancas) -> str:
+        """Querystring com o estado atual e as mudanças (None remove)."""
+        args = dict(self.args, **mudancas)
+        return urlencode({k: v for k, v in args.items() if v not in (None, "")})
+
+    def sort_qs(self, coluna) -> str:
+        """Link do cabeçalho: ordena pela coluna; clicar de novo inverte."""
+        atual = self.args.get("sort")
+        d = "asc" if atual == coluna and self.args.get("dir") != "asc" else "desc"
+        return self.qs(sort=coluna, dir=d, page=None)
+
+
+def _args(raw) -> dict:
+    args = {k: (raw.get(k) or "").strip() for k in PARAMS}
+    if args["sort"] not in SORTS:
+        args["sort"] = ""
+    if args["dir"] not in ("asc", "desc"):
+        args["dir"] = ""
+    return args
+
+
+def _linha(row) -> dict:
+    if row.capa_foto_id:
+        thumb = f"/foto/{row.capa_foto_id}/thumb"
+    else:
+        thumb = row.imagem or None
+
+    d = row._asdict()
+    d["thumb_url"] = thumb
+    return d
+
+
+def page(raw_args, page_size: int = PAGE_SIZE) -> Pagina:
+    args = _args(raw_args)
+    try:
+        n = max(1, int(args["page"] or 1))
+    except ValueError:
+        n = 1
+
+    q = db.session.query(
+        Imovel.id,
+        Imovel.codigo,
+        Imovel.tipo,
+        Imovel.bairro,
+        Imovel.valor,
+        Imovel.status,
+        Imovel.finalidade,
+        Imovel.imagem,
+        Imovel.capa_foto_id,
+        n_fotos,
+        db.func.substr(Imovel.descricao, 1, DESCRICAO_CHARS).label("descricao"),
+    )
+
+    for campo in ("status", "finalidade", "tipo", "bairro"):
+        if args[campo]:
+            q = q.filter(getattr(Imovel, campo) == args[campo])
+
+    ordem = None
+    if args["q"]:
+        ids = search_index.index.search(args["q"])
+        if not ids:
+            return Pagina([], args, n, False)
+        q = q.filter(Imovel.id.in_(ids))
+        ordem = db.case({iid: pos for pos, iid in enumerate(ids)}, value=Imovel.id)
+
+    if args["sort"]:
+        col = SORTS[args["sort"]]
+        desc = args["dir"] != "asc"
+        q = q.order_by(col.desc() if desc else col.asc(), Imovel.id.desc())
+    elif ordem is not None:
+        q = q.order_by(ordem)
+    else:
+        q = q.order_by(Imovel.id.desc())
+
+    rows = q.offset((n - 1) * page_size).limit(page_size + 1).all()
+    return Pagina([_linha(r) for r in rows[:page_size]], args, n, len(rows) > page_size)
@@ -1,21 +1,36 @@
-from flask import Flask, render_template, request, redirect, jsonify, send_file, session
+from flask import Flask, Request, Response, render_template, request, redirect, jsonify, send_file, session, stream_with_context
 from datetime import datetime
-from io import StringIO
-import csv
 import config
-from models import db, Imovel, Lead, Servico, ImovelFoto
+from models import db, Imovel, Lead, Servico, ImovelFoto, ImovelFotoVariante
+import migrations
+import image_pipeline
+import photo_storage
+import photo_cache
+import upload_pipeline
+import listing
+import catalog_version
+import search_index
+import page_cache
+import admin_table
+import brandinho_brain
+import concurrency
+import importer
+import import_jobs
+import photo_import
+import change_feed
+from importer import normalize_status, normalize_finalidade
 import io
+import hashlib
+import hmac
+import csv
 import logging
 from sqlalchemy.pool import QueuePool
-import os
+import tempfile
 
 # ============================================================
 # IMPORTS PARA EXCEL / PARSING
 # ============================================================
 
-import re
-from decimal import Decimal, InvalidOperation
-
 try:
     import openpyxl
     from openpyxl import Workbook
@@ -30,9 +45,25 @@ except Exception:
 # INICIALIZAÇÃO FLASK + BANCO
 # ============================================================
 
+class BrandoRequest(Request):
+    """
+    Limite do corpo por rota: MAX_CONTENT_LENGTH (UPLOAD_MAX_REQUEST_MB)
+    vale para tudo, menos /admin/import com o admin logado, que aceita até
+    IMPORT_MAX_REQUEST_MB (ZIP com as fotos de vários imóveis).
+    """
+
+    @property
+    def max_content_length(self):
+        if self.endpoint == "admin_import" and session.get("admin_auth"):
+            return config.IMPORT_MAX_REQUEST_MB * 1024 * 1024
+        return super().max_content_length
+
+
 app = Flask(__name__)
+app.request_class = BrandoRequest
 app.config["SQLALCHEMY_DATABASE_URI"] = config.SQLALCHEMY_DATABASE_URI
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = config.SQLALCHEMY_TRACK_MODIFICATIONS
+app.config["MAX_CONTENT_LENGTH"] = config.UPLOAD_MAX_REQUEST_MB * 1024 * 1024
 app.secret_key = config.SECRET_KEY
 
 # 🔐 Senha do painel admin (Render)
@@ -74,11 +105,16 @@ def require_admin():
 
 @app.template_filter('brl')
 def format_brl(value):
-    try:
-        value = float(value)
-        return f"R$ {value:,.2f}".replace(",", "v").replace(".", ",").replace("v", ".")
-    except (ValueError, TypeError):
-        return "R$ 0,00"
+    return listing.brl(value)
+
+
+@app.template_global()
+def card_html(i, modelo="venda"):
+    """Card da listagem (templates/_card.html), cacheado por versão do catálogo."""
+    return page_cache.cache.fragment(
+        ("card", modelo, i["id"]),
+        lambda: render_template("_card.html", i=i, temporada=(modelo == "temporada")),
+    )
 
 
 # ============================================================
@@ -95,6 +131,9 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 }
 
 db.init_app(app)
+upload_pipeline.init_app(app)
+import_jobs.init_app(app)
+concurrency.init_app(app)
 
 
 # ============================================================
@@ -107,6 +146,12 @@ def allowed_file(filename: str) -> bool:
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+@app.errorhandler(413)
+def upload_grande_demais(e):
+    limite = (request.max_content_length or 0) // (1024 * 1024)
+    return f"Envio muito grande (limite de {limite} MB por envio).", 413
+
+
 # ============================================================
 # LOGGING
 # ============================================================
@@ -116,79 +161,152 @@ app.logger.info("🚀 Brando Imóveis iniciado com pool seguro.")
 
 
 # ============================================================
-# HELPERS IMPORT/EXPORT (VALOR BRL + CSV DIALECT + STATUS)
+# ROTA PARA SERVIR FOTOS (BLOB)
+# ------------------------------------------------------------
+# Fotos são imutáveis: ETag = sha256 do conteúdo, Last-Modified =
+# criado_em. Revalidações (If-None-Match / If-Modified-Since) são
+# respondidas com 304 só com os metadados — o BLOB não é lido.
+# Range (bytes=...) é atendido pelo make_conditional do Werkzeug.
 # ============================================================
 
-def parse_valor_brl(raw) -> float:
-    """
-    Converte valores em formatos comuns (Excel/CSV) para float (reais):
-      - 1200000
-      - 1200000.00
-      - 1.200.000,00
-      - R$ 1.200.000,00
-      - "R$ 260.000,00"
-    """
-    if raw is None:
-        return 0.0
+def _foto_cache_headers(resp, etag, last_modified):
+    resp.set_etag(etag)
+    if last_modified:
+        resp.last_modified = last_modified
+    resp.headers["Cache-Control"] = (
+        f"public, max-age={config.FOTO_CACHE_MAX_AGE}, immutable"
+    )
+    return resp
 
-    s = str(raw).strip()
-    if not s:
-        return 0.0
 
-    # remove moeda e espaços
-    s = s.replace("R$", "").replace("r$", "").strip()
-    s = s.replace("\u00a0", " ").replace(" ", "")
+def _foto_not_modified(etag, last_modified) -> bool:
+    # If-None-Match tem precedência sobre If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    ims = request.if_modified_since
+    if ims and last_modified:
+        return last_modified.replace(microsecond=0, tzinfo=ims.tzinfo) <= ims
+    return False
 
-    # remove qualquer coisa que não seja dígito, ponto, vírgula, sinal
-    s = re.sub(r"[^0-9\-,.]", "", s)
 
-    # se tem . e , -> padrão BR: 1.234.567,89
-    if "." in s and "," in s:
-        s = s.replace(".", "").replace(",", ".")
-    # se tem só vírgula -> vira decimal
-    elif "," in s and "." not in s:
-        s = s.replace(",", ".")
-    # se tem só ponto -> já é decimal US/Excel ou inteiro com ponto
+def _serve_foto(obj, conteudo=None):
+    """
+    Resposta comum de /foto e /foto/<id>/<variante> (ImovelFoto ou
+    ImovelFotoVariante). Os bytes só são lidos quando o corpo é
+    realmente necessário; no backend fs (ou hit no cache em disco),
+    send_file num caminho real (sendfile + Range/304 do Werkzeug).
+    """
+    etag, last_modified = obj.sha256, obj.criado_em
+    mimetype = obj.mimetype or "image/jpeg"
+
+    if _foto_not_modified(etag, last_modified):
+        resp = Response(status=304)
+        return _foto_cache_headers(resp, etag, last_modified)
+
+    caminho = photo_storage.path(obj) if conteudo is None else None
+
+    if caminho is None and conteudo is None:
+        if request.method == "HEAD" and obj.tamanho is not None:
+            resp = Response(mimetype=mimetype)
+            resp.content_length = obj.tamanho
+            resp.headers["Accept-Ranges"] = "bytes"
+            return _foto_cache_headers(resp, etag, last_modified)
+
+        # BLOB: tenta o cache (memória do worker → disco compartilhado)
+        origem, hit = photo_cache.cache.get(etag)
+        if origem == "disk":
+            caminho = hit
+        elif origem == "mem":
+            conteudo = hit
+        else:
+            conteudo = photo_storage.read(obj)
+            photo_cache.cache.put(etag, conteudo)
+
+    if caminho:
+        resp = send_file(
+            caminho,
+            mimetype=mimetype,
+            conditional=True,
+            etag=etag,
+            last_modified=last_modified,
+            max_age=config.FOTO_CACHE_MAX_AGE,
+        )
+        return _foto_cache_headers(resp, etag, last_modified)
 
-    try:
-        return float(Decimal(s))
-    except (InvalidOperation, ValueError):
-        return 0.0
+    if not conteudo:
+        return "Imagem não encontrada.", 404
+
+    resp = Response(conteudo, mimetype=mimetype)
+    _foto_cache_headers(resp, etag, last_modified)
+    return resp.make_conditional(request, accept_ranges=True, complete_length=len(conteudo))
 
 
-def sniff_csv_dialect(text: str) -> str:
+def _foto_nao_pronta(foto):
     """
-    Detecta delimitador (',' ou ';') usando heurística no header.
+    Foto ainda 'processando' (ou 'erro'): o arquivo é o original do
+    upload, com EXIF/GPS, e finalizar troca os bytes atrás da mesma URL.
+    Público → 404; admin (prévia no painel) → sem cache (no-store).
     """
-    sample = "\n".join(text.splitlines()[:20])
-    header = sample.splitlines()[0] if sample.splitlines() else ""
-    delim = ";" if header.count(";") > header.count(",") else ","
-    return delim
+    if not session.get("admin_auth"):
+        return "Imagem não encontrada.", 404
+    conteudo = photo_storage.read(foto)
+    if not conteudo:
+        return "Imagem não encontrada.", 404
+    resp = Response(conteudo, mimetype=foto.mimetype or "image/jpeg")
+    resp.headers["Cache-Control"] = "no-store"
+    return resp
+
 
+@app.route("/foto/<int:foto_id>")
+def foto_blob(foto_id):
+    # conteudo é deferred no model: aqui só os metadados
+    foto = ImovelFoto.query.filter_by(id=foto_id).first_or_404()
+
+    if foto.status != "pronta":
+        return _foto_nao_pronta(foto)
+
+    conteudo = None
+    if not foto.sha256:
+        # foto antiga ainda sem hash: calcula uma vez e persiste
+        conteudo = photo_storage.read(foto)
+        if not conteudo:
+            return "Imagem não encontrada.", 404
+        foto.sha256 = hashlib.sha256(conteudo).hexdigest()
+        foto.tamanho = len(conteudo)
+        db.session.commit()
 
-def normalize_status(raw, fallback="ativo") -> str:
+    return _serve_foto(foto, conteudo=conteudo)
+
+
+@app.route("/foto/<int:foto_id>/<variante>")
+def foto_variante(foto_id, variante):
     """
-    Garante apenas 'ativo' ou 'inativo'.
-    Se vier qualquer outra coisa, usa fallback.
+    Variante redimensionada (thumb / card / detalhe). WebP quando o
+    navegador anuncia suporte; sem variante gerada → foto original.
     """
-    s = (str(raw).strip().lower() if raw is not None else "")
-    if s in ("ativo", "inativo"):
-        return s
-    return fallback or "ativo"
+    if variante not in image_pipeline.VARIANTES:
+        return "Variante inválida.", 404
 
+    webp = "image/webp" in request.headers.get("Accept", "")
+    opcoes = (
+        ImovelFotoVariante.query
+        .filter_by(foto_id=foto_id, variante=variante)
+        .all()
+    )
+    if not opcoes:
+        return foto_blob(foto_id)
 
-# ============================================================
-# ROTA PARA SERVIR FOTOS (BLOB)
-# ============================================================
-
-@app.route("/foto/<int:foto_id>")
-def foto_blob(foto_id):
-    foto = ImovelFoto.query.get_or_404(foto_id)
-    if not foto.conteudo:
-        return "Imagem não encontrada.", 404
+    preferido = "webp" if webp else "jpeg"
+    v = next((o for o in opcoes if o.formato == preferido), None)
+    if v is None:
+        v = next((o for o in opcoes if o.formato == "jpeg"), None)
+    if v is None:
+        return foto_blob(foto_id)
 
-    mimetype = foto.mimetype or "image/jpeg"
-    return send_file(io.BytesIO(foto.conteudo), mimetype=mimetype)
+    resp = _serve_foto(v)
+    if isinstance(resp, Response):
+        resp.vary.add("Accept")
+    return resp
 
 
 # ============================================================
@@ -196,22 +314,75 @@ def foto_blob(foto_id):
 # ============================================================
 
 @app.route('/')
+@page_cache.cache.cached("home")
 def home():
+    # primeira página renderizada aqui; as seguintes vêm de /api/imoveis
     try:
-        imoveis = Imovel.query.filter_by(status='ativo').all()
-        return render_template('index.html', imoveis=imoveis)
+        imoveis, next_cursor = listing.page({})
+        return render_template('index.html', imoveis=imoveis, next_cursor=next_cursor)
     except Exception as e:
         app.logger.error(f"❌ Erro ao consultar imóveis: {e}")
         return "Erro ao conectar ao banco.", 500
 
 
+@app.route('/api/imoveis')
+def api_imoveis():
+    """
+    Listagem paginada (keyset) dos imóveis ativos.
+    Parâmetros: cursor, limit, finalidade, tipo, bairro, valor_min, valor_max.
+    """
+    try:
+        items, next_cursor = listing.page(
+            listing.parse_filtros(request.args),
+            cursor=listing.parse_cursor(request.args.get('cursor')),
+            limit=listing.parse_limit(request.args.get('limit')),
+        )
+    except Exception as e:
+        app.logger.error(f"❌ Erro ao consultar imóveis: {e}")
+        return jsonify({"error": "Erro ao conectar ao banco."}), 500
+
+    return jsonify({"items": items, "next_cursor": next_cursor})
+
+
+@app.route('/api/busca')
+def api_busca():
+    """Busca pública (índice em memória): cards dos imóveis ativos, ranqueados."""
+    q = request.args.get('q', '')
+    limit = listing.parse_limit(request.args.get('limit'))
+    filtros = listing.parse_filtros(request.args)
+
+    if filtros["finalidade"]:
+        # o índice não conhece a finalidade: filtra no SELECT dos cards
+        ids = search_index.index.search(q, status='ativo')
+        return jsonify({"items": listing.cards_by_ids(ids, filtros)[:limit]})
+
+    ids = search_index.index.search(q, status='ativo', limit=limit)
+    return jsonify({"items": listing.cards_by_ids(ids)})
+
+
+@app.route('/api/brandinho', methods=['POST'])
+def api_brandinho():
+    """Assistente do site: {"q": "..."} → {"answer": "..."} (snapshot em memória)."""
+    data = request.get_json(silent=True) or {}
+    q = data.get('q') or request.form.get('q') or ''
+    try:
+        answer = brandinho_brain.responder(str(q)[:300])
+    except Exception as e:
+        app.logger.error(f"❌ Erro no Brandinho: {e}")
+        answer = "Ops! Não consegui responder agora, tente novamente."
+    return jsonify({"answer": answer})
+
+
 @app.route('/imovel/<int:id>')
+@page_cache.cache.cached("imovel")
 def imovel_detalhe(id):
     imovel = Imovel.query.get(id)
     if not imovel:
         return "Imóvel não encontrado.", 404
 
-    fotos = [f"/foto/{f.id}" for f in imovel.fotos]
+    prontas = [f for f in imovel.fotos if f.status == "pronta"]
+    fotos = [f"/foto/{f.id}/detalhe" for f in prontas]
+    miniaturas = [f"/foto/{f.id}/thumb" for f in prontas]
 
     # Se não tiver fotos BLOB mas tiver imagem antiga
     if not fotos and getattr(imovel, "imagem", None):
@@ -220,7 +391,8 @@ def imovel_detalhe(id):
     if not fotos:
         fotos = ["https://picsum.photos/800/600?blur=1"]
 
-    return render_template("imovel.html", imovel=imovel, fotos=fotos)
+    return render_template("imovel.html", imovel=imovel, fotos=fotos,
+                           miniaturas=miniaturas or fotos)
 
 
 # ============================================================
@@ -243,6 +415,7 @@ def set_capa(imovel_id, foto_id):
         imovel.imagem = f"/foto/{foto.id}"
 
     db.session.commit()
+    catalogo_alterado(imoveis=[imovel])
     return redirect(f"/admin/edit/{imovel_id}")
 
 
@@ -255,8 +428,11 @@ def remove_foto(imovel_id, foto_id):
     foto = ImovelFoto.query.get_or_404(foto_id)
 
     was_capa = foto.is_capa
+    hashes = photo_storage.hashes_for(foto_id=foto.id)
     db.session.delete(foto)
     db.session.commit()
+    photo_storage.release(hashes)
+    photo_cache.cache.invalidate(hashes)
 
     imovel = Imovel.query.get_or_404(imovel_id)
     if was_capa and imovel.fotos:
@@ -265,6 +441,7 @@ def remove_foto(imovel_id, foto_id):
             imovel.imagem = f"/foto/{imovel.fotos[0].id}"
         db.session.commit()
 
+    catalogo_alterado(imoveis=[imovel])
     return redirect(f"/admin/edit/{imovel_id}")
 
 
@@ -311,20 +488,9 @@ def admin():
     r = require_admin()
     if r: return r
 
-    q = request.args.get('q', '')
-    base = Imovel.query
-
-    if q:
-        like = f"%{q}%"
-        base = base.filter(
-            Imovel.codigo.ilike(like) |
-            Imovel.tipo.ilike(like) |
-            Imovel.bairro.ilike(like) |
-            Imovel.descricao.ilike(like)
-        )
-
-    imoveis = base.order_by(Imovel.id.desc()).all()
-    return render_template('admin.html', imoveis=imoveis, imovel=None)
+    tabela = admin_table.page(request.args)
+    return render_template('admin.html', tabela=tabela, imovel=None,
+                           import_job=request.args.get('import'))
 
 
 @app.route('/admin/edit/<int:id>')
@@ -333,8 +499,8 @@ def admin_edit(id):
     if r: return r
 
     imovel = Imovel.query.get(id)
-    imoveis = Imovel.query.order_by(Imovel.id.desc()).all()
-    return render_template('admin.html', imoveis=imoveis, imovel=imovel)
+    tabela = admin_table.page(request.args)
+    return render_template('admin.html', tabela=tabela, imovel=imovel)
 
 
 @app.route('/admin/delete/<int:id>')
@@ -344,11 +510,42 @@ def admin_delete(id):
 
     item = Imovel.query.get(id)
     if item:
+        hashes = photo_storage.hashes_for(imovel_id=item.id)
         db.session.delete(item)
         db.session.commit()
+        photo_storage.release(hashes)
+        photo_cache.cache.invalidate(hashes)
+        catalogo_alterado(removidos=[id])
     return redirect('/admin')
 
 
+# ============================================================
+# CATÁLOGO ALTERADO (índice de busca + cache de páginas + versão compartilhada)
+# ============================================================
+
+def catalogo_alterado(imoveis=(), removidos=(), incremental=True):
+    """
+    Chamado depois de cada escrita do admin no catálogo: refaz os cards
+    da listagem (imovel_cards), aplica a mudança no índice de busca deste
+    worker e avança a versão do catálogo (os outros workers remontam o
+    que têm em memória quando a versão muda, e o page_cache de todos
+    descarta as páginas renderizadas).
+    incremental=False (importação) refaz todos os cards e só avança a versão.
+    """
+    if incremental:
+        listing.atualizar_cards([i.id for i in imoveis] + list(removidos))
+        for i in imoveis:
+            search_index.index.upsert(i)
+        for iid in removidos:
+            search_index.index.remove(iid)
+    else:
+        listing.reconstruir_cards()
+
+    versao = catalog_version.bump()
+    if incremental:
+        search_index.index.mark_version(versao)
+
+
 # ============================================================
 # SALVAR IMÓVEL + UPLOAD MÚLTIPLO (BLOB)
 # ============================================================
@@ -370,34 +567,64 @@ def admin_save():
     obj.bairro = form.get('bairro')
     obj.descricao = form.get('descricao')
     obj.status = normalize_status(form.get('status'), fallback=obj.status or "ativo")
+    obj.finalidade = normalize_finalidade(form.get('finalidade'), tipo=obj.tipo)
 
     try:
         obj.valor = float((form.get('valor') or "0").replace(',', '.'))
     except Exception:
         obj.valor = 0.0
 
-    files = request.files.getlist('imagens')
-    ja_tem_fotos = len(obj.fotos) > 0
+    # grava o imóvel antes: cada foto abaixo tem o próprio commit
+    db.session.commit()
+    catalogo_alterado(imoveis=[obj])
+
+    # hashes já existentes no imóvel (dedup de re-upload)
+    hashes = {
+        h for (h,) in db.session.query(
+            db.func.coalesce(ImovelFoto.origem_sha256, ImovelFoto.sha256)
+        ).filter_by(imovel_id=obj.id)
+    }
+    ja_tem_fotos = db.session.query(ImovelFoto.id).filter_by(imovel_id=obj.id).first() is not None
+    max_bytes = config.UPLOAD_MAX_FILE_MB * 1024 * 1024
+
+    # uma foto por vez: stream → sha256 → storage → commit → pool de imagens
+    # (memória por requisição limitada a um arquivo; decode/EXIF/variantes
+    # rodam fora da requisição — a foto fica 'processando' até terminar)
+    for file in request.files.getlist('imagens'):
+        if not (file and file.filename and allowed_file(file.filename)):
+            continue
 
-    for file in files:
-        if file and file.filename and allowed_file(file.filename):
-            conteudo = file.read()
-            if not conteudo:
+        try:
+            sha, tamanho, tmp = photo_storage.spool_upload(file.stream, max_bytes)
+        except photo_storage.UploadTooLarge as e:
+            app.logger.warning(f"⚠️ Foto ignorada ({file.filename}): {e}")
+            continue
+
+        with tmp:
+            if not tamanho or sha in hashes:
+                continue
+
+            # tipo real pelos magic bytes (file.mimetype vem do navegador)
+            mimetype = image_pipeline.detectar_mimetype(tmp.read(16))
+            if not mimetype:
+                app.logger.warning(f"⚠️ Foto ignorada ({file.filename}): não é JPEG/PNG/GIF")
                 continue
 
             foto = ImovelFoto(
-                imovel=obj,
-                conteudo=conteudo,
-                mimetype=file.mimetype or "image/jpeg"
+                imovel_id=obj.id,
+                mimetype=mimetype,
+                is_capa=not ja_tem_fotos,
+                status="processando",
+                origem_sha256=sha,
             )
-
-            if not ja_tem_fotos and not any(f.is_capa for f in obj.fotos):
-                foto.is_capa = True
-
+            photo_storage.store_file(foto, sha, tamanho, tmp)
             db.session.add(foto)
-            ja_tem_fotos = True
+            db.session.commit()
 
-    db.session.commit()
+            upload_pipeline.enfileirar(foto.id, upload_pipeline.stage(tmp))
+
+        hashes.add(sha)
+        ja_tem_fotos = True
 
     if obj.fotos and not any(f.is_capa for f in obj.fotos):
         obj.fotos[0].is_capa = True
@@ -425,7 +652,7 @@ def admin_modelo_xlsx():
     ws = wb.active
     ws.title = "imoveis"
 
-    headers = ["codigo", "tipo", "valor", "bairro", "descricao", "status"]
+    headers = ["codigo", "tipo", "valor", "bairro", "descricao", "status", "finalidade"]
     ws.append(headers)
 
     # Exemplo (ajuda a preencher certo)
@@ -435,13 +662,14 @@ def admin_modelo_xlsx():
         260000.00,
         "Ingleses",
         "Exemplo: 2 quartos, 1 suíte, sacada com churrasqueira...",
-        "ativo"
+        "ativo",
+        "venda"
     ])
 
     ws.freeze_panes = "A2"
 
     # Larguras
-    col_widths = {"A": 12, "B": 18, "C": 14, "D": 18, "E": 60, "F": 12}
+    col_widths = {"A": 12, "B": 18, "C": 14, "D": 18, "E": 60, "F": 12, "G": 14}
     for col, w in col_widths.items():
         ws.column_dimensions[col].width = w
 
@@ -455,6 +683,9 @@ def admin_modelo_xlsx():
         dv_status = DataValidation(type="list", formula1='"ativo,inativo"', allow_blank=True)
         ws.add_data_validation(dv_status)
         dv_status.add("F2:F2000")
+        dv_finalidade = DataValidation(type="list", formula1='"venda,temporada"', allow_blank=True)
+        ws.add_data_validation(dv_finalidade)
+        dv_finalidade.add("G2:G2000")
 
     # Aba de instruções
     ws2 = wb.create_sheet("LEIA-ME")
@@ -463,6 +694,7 @@ def admin_modelo_xlsx():
     ws2.append(["2) Status deve ser: ativo ou inativo (use o dropdown)."])
     ws2.append(["3) Código é obrigatório e deve ser único (A001, C003, T010...)."])
     ws2.append(["4) Mantenha os nomes das colunas exatamente como no header."])
+    ws2.append(["5) Finalidade (opcional): venda ou temporada. Vazio = venda, ou temporada se o tipo disser 'temporada'."])
     ws2.column_dimensions["A"].width = 90
 
     out = io.BytesIO()
@@ -485,28 +717,9 @@ def admin_export_xlsx():
     if openpyxl is None or Workbook is None:
         return "openpyxl não está instalado no servidor. Adicione no requirements.txt", 500
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "imoveis"
-
-    ws.append(["codigo", "tipo", "valor", "bairro", "descricao", "status"])
-
-    for i in Imovel.query.order_by(Imovel.id).all():
-        ws.append([
-            i.codigo,
-            i.tipo,
-            float(i.valor or 0),
-            i.bairro,
-            i.descricao or "",
-            normalize_status(i.status, "ativo"),
-        ])
-
-    for row in ws.iter_rows(min_row=2, min_col=3, max_col=3):
-        for cell in row:
-            cell.number_format = 'R$ #,##0.00'
-
-    out = io.BytesIO()
-    wb.save(out)
+    # XLSX é um zip: é montado num arquivo temporário (não na memória) e enviado dele
+    out = tempfile.TemporaryFile()
+    importer.salvar_xlsx(out)
     out.seek(0)
 
     return send_file(
@@ -522,35 +735,22 @@ def admin_export_csv():
     r = require_admin()
     if r: return r
 
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(['codigo', 'tipo', 'valor', 'bairro', 'descricao', 'status'])
-
-    for i in Imovel.query.order_by(Imovel.id).all():
-        writer.writerow([
-            i.codigo,
-            i.tipo,
-            float(i.valor or 0),  # número puro no CSV (sem R$)
-            i.bairro,
-            (i.descricao or '').replace("\n", " "),
-            normalize_status(i.status, "ativo")
-        ])
-
-    output = si.getvalue().encode('utf-8')
-    return send_file(
-        io.BytesIO(output),
+    return Response(
+        stream_with_context(importer.csv_stream()),
         mimetype='text/csv',
-        as_attachment=True,
-        download_name='imoveis.csv'
+        headers={"Content-Disposition": "attachment; filename=imoveis.csv"},
     )
 
 
 @app.route('/admin/import', methods=['POST'])
 def admin_import():
     """
-    Importa tanto XLSX quanto CSV.
+    Importa tanto XLSX quanto CSV, em segundo plano (ver import_jobs.py).
     - Principal: XLSX (Excel)
     - Fallback: CSV com delimitador detectado e encoding robusto
+    - ZIP: fotos nomeadas pelo código (A001_1.jpg, A001_capa.jpg), ver photo_import.py
+    - dry_run=1: só valida e mostra o que mudaria, sem gravar
+    Responde logo com o id do job; o progresso fica em /admin/import/<id>.
     """
     r = require_admin()
     if r:
@@ -561,125 +761,104 @@ def admin_import():
         return redirect('/admin')
 
     filename = (file.filename or "").lower()
-    count = 0
-
-    expected_headers = ["codigo", "tipo", "valor", "bairro", "descricao", "status"]
 
-    # ------------------------
-    # XLSX (principal)
-    # ------------------------
     if filename.endswith((".xlsx", ".xlsm", ".xltx", ".xltm")):
         if openpyxl is None:
             return "openpyxl não está instalado no servidor. Adicione no requirements.txt", 500
+        formato = "xlsx"
+    elif filename.endswith(".zip"):
+        formato = "zip"
+    else:
+        formato = "csv"
 
-        wb = openpyxl.load_workbook(file, data_only=True)
-        ws = wb.active
-
-        headers = []
-        for cell in ws[1]:
-            headers.append((str(cell.value).strip().lower() if cell.value is not None else ""))
-
-        missing = [h for h in expected_headers if h not in headers]
-        if missing:
-            return (
-                f"Planilha inválida. Faltando colunas: {', '.join(missing)}. "
-                f"Use o modelo oficial (/admin/modelo.xlsx)."
-            ), 400
-
-        def col_idx(name: str):
-            return headers.index(name)
-
-        idx_codigo = col_idx("codigo")
-        idx_tipo = col_idx("tipo")
-        idx_valor = col_idx("valor")
-        idx_bairro = col_idx("bairro")
-        idx_desc = col_idx("descricao")
-        idx_status = col_idx("status")
-        idx_imagem = headers.index("imagem") if "imagem" in headers else None  # opcional
-
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            # pula linha totalmente vazia
-            if not row or all(v is None or str(v).strip() == "" for v in row):
-                continue
+    try:
+        job_id = import_jobs.criar(
+            file.stream, formato, file.filename,
+            dry_run=request.form.get('dry_run') in ("1", "on", "true"),
+        )
+    except (importer.PlanilhaInvalida, photo_import.ZipInvalido) as e:
+        return str(e), 400
 
-            codigo = (str(row[idx_codigo]).strip() if row[idx_codigo] is not None else "")
-            if not codigo:
-                continue
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(import_jobs.estado(job_id)), 202
+    return redirect(f'/admin?import={job_id}')
 
-            obj = Imovel.query.filter_by(codigo=codigo).first()
-            if not obj:
-                obj = Imovel(codigo=codigo)
-                db.session.add(obj)
 
-            obj.tipo = (str(row[idx_tipo]).strip() if row[idx_tipo] is not None else (obj.tipo or ""))
-            obj.bairro = (str(row[idx_bairro]).strip() if row[idx_bairro] is not None else (obj.bairro or ""))
-            obj.descricao = (str(row[idx_desc]).strip() if row[idx_desc] is not None else (obj.descricao or ""))
+@app.route('/admin/import/<job_id>')
+def admin_import_status(job_id):
+    r = require_admin()
+    if r:
+        return r
 
-            obj.status = normalize_status(row[idx_status], fallback=obj.status or "ativo")
-            obj.valor = parse_valor_brl(row[idx_valor])
+    job = import_jobs.estado(job_id)
+    if not job:
+        return jsonify({"erro": "job não encontrado"}), 404
+    return jsonify(job)
 
-            # imagem opcional (se existir no modelo)
-            if idx_imagem is not None and hasattr(obj, "imagem"):
-                img = (str(row[idx_imagem]).strip() if row[idx_imagem] is not None else "")
-                if img:
-                    obj.imagem = img
 
-            count += 1
+@app.route('/admin/import/<job_id>/cancelar', methods=['POST'])
+def admin_import_cancelar(job_id):
+    r = require_admin()
+    if r:
+        return r
 
-        db.session.commit()
-        app.logger.info(f"✅ Importados/atualizados via XLSX: {count}")
-        return redirect('/admin')
+    job = import_jobs.cancelar(job_id)
+    if not job:
+        return jsonify({"erro": "job não encontrado"}), 404
+    return jsonify(job)
 
-    # ------------------------
-    # CSV (fallback)
-    # ------------------------
-    raw = file.stream.read()
-    try:
-        text = raw.decode('utf-8-sig')
-    except UnicodeDecodeError:
-        text = raw.decode('latin-1')
-
-    delim = sniff_csv_dialect(text)
-    stream = io.StringIO(text)
-    reader = csv.DictReader(stream, delimiter=delim)
-
-    csv_headers = [h.strip().lower() for h in (reader.fieldnames or [])]
-    missing = [h for h in expected_headers if h not in csv_headers]
-    if missing:
-        return (
-            f"CSV inválido. Faltando colunas: {', '.join(missing)}. "
-            f"Use o modelo oficial (/admin/modelo.xlsx)."
-        ), 400
-
-    for row in reader:
-        codigo = (row.get('codigo') or '').strip()
-        if not codigo:
-            continue
 
-        obj = Imovel.query.filter_by(codigo=codigo).first()
-        if not obj:
-            obj = Imovel(codigo=codigo)
-            db.session.add(obj)
+# ============================================================
+# FEED DE MUDANÇAS (DELTA PARA PORTAIS / BACKUPS)
+# ------------------------------------------------------------
+# GET /admin/delta?entidade=imoveis&desde=<cursor>&limit=1000&formato=json|csv
+# Devolve o que mudou (e o que foi removido) depois do cursor, em ordem.
+# A sincronização guarda o cursor devolvido e repete enquanto tem_mais.
+# ============================================================
 
-        obj.tipo = (row.get('tipo') or obj.tipo or '').strip()
-        obj.bairro = (row.get('bairro') or obj.bairro or '').strip()
-        obj.descricao = (row.get('descricao') or obj.descricao or '').strip()
-        obj.status = normalize_status(row.get('status'), fallback=obj.status or "ativo")
+def _delta_autorizado() -> bool:
+    if session.get("admin_auth"):
+        return True
+    token = config.DELTA_TOKEN
+    auth = request.headers.get("Authorization", "")
+    # bytes: compare_digest com str recusa (TypeError) cabeçalho não-ASCII
+    return bool(token) and hmac.compare_digest(auth.encode(), f"Bearer {token}".encode())
 
-        v = (row.get('valor') or '').strip()
-        if v:
-            obj.valor = parse_valor_brl(v)
 
-        if hasattr(obj, "imagem"):
-            img = (row.get('imagem') or '').strip()
-            if img:
-                obj.imagem = img
+@app.route('/admin/delta')
+def admin_delta():
+    if not _delta_autorizado():
+        return jsonify({"erro": "não autorizado"}), 401
 
-        count += 1
+    entidade = request.args.get("entidade", "imoveis")
+    if entidade not in change_feed.ENTIDADES:
+        return jsonify({"erro": f"entidade inválida (use {', '.join(change_feed.ENTIDADES)})"}), 400
+    try:
+        cursor = change_feed.parse_cursor(request.args.get("desde"))
+    except change_feed.CursorInvalido as e:
+        return jsonify({"erro": str(e)}), 400
 
-    db.session.commit()
-    app.logger.info(f"✅ Importados/atualizados via CSV: {count} (delim='{delim}')")
-    return redirect('/admin')
+    itens, proximo, tem_mais = change_feed.delta(
+        entidade, cursor, change_feed.parse_limit(request.args.get("limit")),
+    )
+    itens = [change_feed.serializar(i) for i in itens]
+
+    if request.args.get("formato") != "csv":
+        return jsonify({"entidade": entidade, "itens": itens, "cursor": proximo, "tem_mais": tem_mais})
+
+    si = io.StringIO()
+    writer = csv.DictWriter(si, fieldnames=change_feed.colunas(entidade), extrasaction="ignore")
+    writer.writeheader()
+    writer.writerows(itens)
+    return Response(
+        si.getvalue(),
+        mimetype="text/csv",
+        headers={
+            "Content-Disposition": f"attachment; filename=delta-{entidade}.csv",
+            "X-Delta-Cursor": proximo or "",
+            "X-Delta-Tem-Mais": "1" if tem_mais else "0",
+        },
+    )
 
 
 # ============================================================
@@ -768,9 +947,72 @@ def update_servico(id):
 # ============================================================
 
 @app.route('/temporada')
+@page_cache.cache.cached("temporada")
 def temporada():
-    imoveis = Imovel.query.filter(Imovel.status == 'ativo').all()
-    return render_template('temporada.html', imoveis=imoveis)
+    # mesma listagem da home, só finalidade='temporada' (índice status+finalidade+id)
+    try:
+        imoveis, next_cursor = listing.page({"finalidade": "temporada"})
+        return render_template('temporada.html', imoveis=imoveis, next_cursor=next_cursor)
+    except Exception as e:
+        app.logger.error(f"❌ Erro ao consultar imóveis de temporada: {e}")
+        return "Erro ao conectar ao banco.", 500
+
+
+# ============================================================
+# MÉTRICAS (admin)
+# ============================================================
+
+@app.route('/admin/metricas')
+def admin_metricas():
+    r = require_admin()
+    if r: return r
+
+    return jsonify({
+        "fotos_cache": photo_cache.cache.snapshot(),
+        "paginas_cache": page_cache.cache.snapshot(),
+        "brandinho_respostas": brandinho_brain.respostas.snapshot(),
+        "concorrencia": concurrency.snapshot(),
+    })
+
+
+# ============================================================
+# COMANDOS CLI (flask --app app db-upgrade | db-explain | fotos-variantes
+#               | fotos-migrar | fotos-reprocessar)
+# ============================================================
+
+@app.cli.command("db-upgrade")
+def db_upgrade_command():
+    """Cria tabelas novas e aplica migrações pendentes."""
+    n = migrations.upgrade()
+    print(f"✅ Banco de dados ok ({n} migrações aplicadas)")
+
+
+@app.cli.command("db-explain")
+def db_explain_command():
+    """EXPLAIN das consultas quentes: confere se usam os índices esperados."""
+    if not migrations.explain_report():
+        raise SystemExit(1)
+
+
+@app.cli.command("fotos-variantes")
+def fotos_variantes_command():
+    """Gera variantes (thumb/card/detalhe) das fotos que ainda não têm."""
+    n = image_pipeline.backfill_variantes()
+    print(f"✅ Variantes geradas para {n} fotos")
+
+
+@app.cli.command("fotos-migrar")
+def fotos_migrar_command():
+    """Move os bytes das fotos do MySQL (BLOB) para PHOTO_STORAGE_DIR. Retomável."""
+    n = photo_storage.migrate_to_fs()
+    print(f"✅ {n} fotos/variantes movidas para {config.PHOTO_STORAGE_DIR}")
+
+
+@app.cli.command("fotos-reprocessar")
+def fotos_reprocessar_command():
+    """Processa fotos que ficaram em 'processando' (ex.: worker reiniciado)."""
+    n = upload_pipeline.reprocessar_pendentes()
+    print(f"✅ {n} fotos reprocessadas")
 
 
 # ============================================================
@@ -779,6 +1021,6 @@ def temporada():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
+        migrations.upgrade()
         print("✅ Banco de dados ok")
     app.run(debug=True)
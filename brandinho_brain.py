@@ -1,61 +1,206 @@
 # ============================================================
 # brandinho_brain.py
 # ------------------------------------------------------------
-# Brandinho v1.3 - responde com base nos imóveis reais do banco
+# Brandinho v1.5 - responde com base nos imóveis reais do banco
+#
+# Os imóveis ativos (id, tipo, bairro, valor) ficam num snapshot em
+# memória por worker, refeito só quando a versão do catálogo muda
+# (catalog_version) — cada mensagem do chat não vai ao MySQL.
+# A interpretação da mensagem fica em brandinho_intent (o gazetteer é
+# recompilado junto com o snapshot); o ranking, em brandinho_rank.
+# Perguntas frequentes saem de uma tabela fixa (só quando a mensagem não
+# traz tipo, bairro nem valor) e as respostas do catálogo ficam em cache
+# pela intenção interpretada.
 # ============================================================
 
+import threading
+from collections import OrderedDict
+
+import catalog_version
+from brandinho_intent import normalizar, parser
+from brandinho_rank import RankingEngine
 from models import Imovel, db
-import re
 
-def responder(q: str) -> str:
-    q = (q or "").lower().strip()
-    if not q:
-        return "Olá! 👋 Posso te ajudar a encontrar casas e apartamentos. Diga um bairro ou valor."
+
+class CatalogoSnapshot:
+    """
+    Imóveis ativos em memória: [(id, tipo, bairro, valor, tipo_n, bairro_n)],
+    mais novos primeiro, e as mesmas linhas em colunas para o ranking.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rows = []
+        self.ranking = RankingEngine([])
+        self.version = None
+
+    def rebuild(self):
+        versao = catalog_version.current()
+        rows = [
+            (r.id, r.tipo or "", r.bairro or "", float(r.valor or 0),
+             normalizar(r.tipo), normalizar(r.bairro))
+            for r in db.session.query(Imovel.id, Imovel.tipo, Imovel.bairro, Imovel.valor)
+            .filter(Imovel.status == "ativo")
+            .order_by(Imovel.id.desc())
+        ]
+        ranking = RankingEngine(rows)
+        with self._lock:
+            self.rows = rows
+            self.ranking = ranking
+            self.version = versao
+        parser.compilar({r[1] for r in rows}, [r[2] for r in rows])
+
+    def ensure_fresh(self):
+        """(ranking, versão) do mesmo snapshot, lidos juntos sob o lock."""
+        if self.version != catalog_version.current():
+            self.rebuild()
+        with self._lock:
+            return self.ranking, self.version
+
+
+snapshot = CatalogoSnapshot()
+
+
+# ============================================================
+# ❓ PERGUNTAS FREQUENTES
+# ------------------------------------------------------------
+# Frases já normalizadas (sem acento). FAQ_FRASES vale se a frase
+# aparece na mensagem; FAQ_EXATAS só se a mensagem inteira for ela.
+# Só consultadas quando a intenção não tem tipo, bairro nem valor:
+# "apartamento com área de serviço em Canasvieiras" é busca, não FAQ.
+# ============================================================
+ENDERECO = "📍 Rua Intendente Antônio Damasco, 2330 - Ratones / Florianópolis."
+HORARIO = "Nosso atendimento é de segunda a sexta, das 9h às 18h 🕒."
+SERVICOS = "Se você já comprou conosco, pode abrir um chamado em /servicos 🛠️."
+
+FAQ_FRASES = (
+    (("servico", "servicos", "reparo", "manutencao", "chamado"), SERVICOS),
+    (("endereco", "localizacao", "onde voces", "onde fica a imobiliaria",
+      "onde fica o escritorio", "onde fica a brando"), ENDERECO),
+    (("horario", "funciona", "atendimento"), HORARIO),
+)
+
+FAQ_EXATAS = {
+    "onde fica": ENDERECO,
+    "onde ficam": ENDERECO,
+    "onde": ENDERECO,
+}
+
+
+def responder_faq(q: str):
+    """Resposta da tabela fixa, ou None."""
+    qn = normalizar(q).strip(" ?!.")
+    if qn in FAQ_EXATAS:
+        return FAQ_EXATAS[qn]
+    padded = f" {' '.join(qn.replace('?', ' ').split())} "
+    for frases, resposta in FAQ_FRASES:
+        if any(f" {f} " in padded for f in frases):
+            return resposta
+    return None
+
+
+# ============================================================
+# 💾 CACHE DE RESPOSTAS POR INTENÇÃO
+# ------------------------------------------------------------
+# "apto canasvieiras" e "apartamento em Canasvieiras" viram a mesma
+# Intencao; a resposta do catálogo é guardada por (versão, intenção).
+# ============================================================
+class RespostaCache:
+
+    def __init__(self, max_itens: int = 1024):
+        self.max_itens = max_itens
+        self._lock = threading.Lock()
+        self._itens = OrderedDict()
+        self.version = None
+        self.stats = {"hits": 0, "misses": 0, "faq": 0}
+
+    def get(self, versao, intencao):
+        with self._lock:
+            if self.version != versao:
+                self._itens.clear()
+                self.version = versao
+            if intencao in self._itens:
+                self._itens.move_to_end(intencao)
+                self.stats["hits"] += 1
+                return True, self._itens[intencao]
+            self.stats["misses"] += 1
+            return False, None
+
+    def put(self, versao, intencao, resposta):
+        with self._lock:
+            if self.version != versao:
+                return
+            self._itens[intencao] = resposta
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            s = dict(self.stats, itens=len(self._itens), versao=self.version)
+        total = s["hits"] + s["misses"]
+        s["hit_ratio"] = round(s["hits"] / total, 4) if total else None
+        return s
+
+
+respostas = RespostaCache()
+
+
+def _resposta_catalogo(ranking, intencao):
+    """Resposta com os imóveis do ranking, ou None se nada serve."""
+    tipo_encontrado = parser.nome("tipo", intencao.tipo) if intencao.tipo else None
+    bairro_encontrado = parser.nome("bairro", intencao.bairro) if intencao.bairro else None
 
     # ============================================================
-    # 🔍 INTERPRETAÇÃO BÁSICA (tipo, bairro, valor)
+    # 🔎 RANKING NO SNAPSHOT (tipo, bairro, valor, recência)
     # ============================================================
-    tipos = ["casa", "apartamento", "apto", "cobertura", "terreno", "sala", "studio"]
-    bairros = ["ratones", "canasvieiras", "jurere", "jurerê", "ingleses", "rio vermelho", "vargem"]
-    tipo_encontrado = next((t for t in tipos if t in q), None)
-    bairro_encontrado = next((b for b in bairros if b in q), None)
-
-    # Extrair valor "até xxx mil"
-    valor_max = None
-    match_valor = re.search(r"(\d+[.,]?\d*)\s*(mil|milhão|milhoes|m)", q)
-    if match_valor:
-        num = match_valor.group(1).replace(",", ".")
-        mult = 1000 if "mil" in match_valor.group(2) else 1_000_000
-        valor_max = float(num) * mult
+    linhas, aproximado = ranking.top(intencao, k=5)
+    encontrados = [(tipo, bairro, valor) for _, tipo, bairro, valor, _, _ in linhas]
+    if not encontrados:
+        return None
 
     # ============================================================
-    # 🔎 CONSTRUÇÃO DE QUERY DINÂMICA
+    # 📊 GERAR RESPOSTA DINÂMICA
     # ============================================================
-    query = Imovel.query.filter_by(status="ativo")
+    resumo = ", ".join([f"{tipo} em {bairro} (R$ {valor:,.0f})" for tipo, bairro, valor in encontrados])
+    total = len(encontrados)
+    if aproximado:
+        return f"Não achei nada exatamente nessa faixa de valor, mas estes chegam perto 🔎: {resumo}."
+    if bairro_encontrado and tipo_encontrado:
+        return f"Encontrei {total} {tipo_encontrado}{'s' if total>1 else ''} em {bairro_encontrado} 🏡: {resumo}."
+    elif tipo_encontrado:
+        return f"Tenho {total} {tipo_encontrado}{'s' if total>1 else ''} disponíveis em várias regiões de Floripa 🌴: {resumo}."
+    elif bairro_encontrado:
+        return f"Veja o que encontrei em {bairro_encontrado} 🌇: {resumo}."
+    else:
+        return f"Encontrei {total} imóveis disponíveis: {resumo}."
 
-    if tipo_encontrado:
-        query = query.filter(Imovel.tipo.ilike(f"%{tipo_encontrado}%"))
-    if bairro_encontrado:
-        query = query.filter(Imovel.bairro.ilike(f"%{bairro_encontrado}%"))
-    if valor_max:
-        query = query.filter(Imovel.valor <= valor_max)
 
-    encontrados = query.limit(5).all()
+def responder(q: str) -> str:
+    q = (q or "").lower().strip()
+    if not q:
+        return "Olá! 👋 Posso te ajudar a encontrar casas e apartamentos. Diga um bairro ou valor."
 
     # ============================================================
-    # 📊 GERAR RESPOSTA DINÂMICA
+    # 🔍 INTERPRETAÇÃO (tipo, bairro, faixa de valor)
     # ============================================================
-    if encontrados:
-        resumo = ", ".join([f"{i.tipo} em {i.bairro} (R$ {i.valor:,.0f})" for i in encontrados])
-        total = len(encontrados)
-        if bairro_encontrado and tipo_encontrado:
-            return f"Encontrei {total} {tipo_encontrado}{'s' if total>1 else ''} em {bairro_encontrado.capitalize()} 🏡: {resumo}."
-        elif tipo_encontrado:
-            return f"Tenho {total} {tipo_encontrado}{'s' if total>1 else ''} disponíveis em várias regiões de Floripa 🌴: {resumo}."
-        elif bairro_encontrado:
-            return f"Veja o que encontrei em {bairro_encontrado.capitalize()} 🌇: {resumo}."
-        else:
-            return f"Encontrei {total} imóveis disponíveis: {resumo}."
+    # também recompila o parser se o catálogo mudou; a resposta fica no
+    # cache sob a versão do ranking que a calculou
+    ranking, versao = snapshot.ensure_fresh()
+    intencao = parser.interpretar(q)
+
+    if not any(intencao):
+        faq = responder_faq(q)
+        if faq:
+            with respostas._lock:
+                respostas.stats["faq"] += 1
+            return faq
+
+    achou, resposta = respostas.get(versao, intencao)
+    if not achou:
+        resposta = _resposta_catalogo(ranking, intencao)
+        respostas.put(versao, intencao, resposta)
+    if resposta:
+        return resposta
 
     # ============================================================
     # 🔁 RESPOSTAS GENÉRICAS
@@ -64,12 +209,6 @@ def responder(q: str) -> str:
         return "Comprar um imóvel é um ótimo investimento 🏡. Pode me dizer o bairro ou faixa de valor?"
     if "alugar" in q:
         return "Também temos opções de locação 🏠. Quer ver casas ou apartamentos?"
-    if "serviço" in q or "reparo" in q or "manutenção" in q or "chamado" in q:
-        return "Se você já comprou conosco, pode abrir um chamado em /servicos 🛠️."
-    if "onde" in q or "endereço" in q or "fica" in q or "localização" in q:
-        return "📍 Rua Intendente Antônio Damasco, 2330 - Ratones / Florianópolis."
-    if "horario" in q or "funciona" in q or "atendimento" in q:
-        return "Nosso atendimento é de segunda a sexta, das 9h às 18h 🕒."
 
     # ============================================================
     # 🔚 FALLBACK
@@ -0,0 +1,234 @@
+# ============================================================
+# brandinho_intent.py
+# ------------------------------------------------------------
+# Interpretação das mensagens do Brandinho: tipo, bairro e faixa de
+# valor.
+#
+# - Gazetteer montado dos valores do próprio catálogo (tipos e bairros
+#   distintos) + uma base fixa, sem acento e com sinônimos
+#   ("apto" → apartamento, "kitnet" → studio, plurais).
+# - Compilado uma vez numa trie de tokens: cada mensagem é lida da
+#   esquerda para a direita pegando o termo mais longo em cada posição
+#   ("jurere internacional" antes de "jurere").
+# - Valores: "até 600 mil", "entre 400 e 600 mil", "acima de 1 milhão",
+#   "de 300 a 450 mil", "1,5 milhão". Número sem mil/k/milhão só vale
+#   como preço a partir de VALOR_SEM_UNIDADE_MIN ("até 600000"); "de 2 a
+#   3 quartos" ou "até 3 quartos" não viram faixa de valor.
+# - parse() é memoizado pelo texto normalizado; recompilar (catálogo
+#   mudou) descarta a memória.
+# ============================================================
+
+import functools
+import re
+import threading
+from collections import Counter, namedtuple
+
+from search_index import fold
+
+Intencao = namedtuple("Intencao", "tipo bairro valor_min valor_max")
+
+# termo canônico (sem acento) → como aparece na resposta
+TIPOS_BASE = {
+    "casa": "casa",
+    "apartamento": "apartamento",
+    "cobertura": "cobertura",
+    "terreno": "terreno",
+    "sala": "sala",
+    "studio": "studio",
+    "sobrado": "sobrado",
+}
+
+BAIRROS_BASE = {
+    "ratones": "Ratones",
+    "canasvieiras": "Canasvieiras",
+    "jurere": "Jurerê",
+    "ingleses": "Ingleses",
+    "rio vermelho": "Rio Vermelho",
+    "vargem": "Vargem",
+}
+
+SINONIMOS = {
+    "apto": "apartamento",
+    "apart": "apartamento",
+    "ape": "apartamento",
+    "ap": "apartamento",
+    "kitnet": "studio",
+    "kitinete": "studio",
+    "quitinete": "studio",
+    "estudio": "studio",
+    "lote": "terreno",
+    "sobradinho": "sobrado",
+    "canas": "canasvieiras",
+}
+
+# palavras de bairro que sozinhas não identificam nada
+_GENERICAS = {"de", "da", "do", "das", "dos", "e", "sul", "norte", "centro", "praia", "grande",
+              "pequeno", "rio", "vila", "jardim", "alto", "baixo", "sao", "santa", "santo"}
+
+_TOKEN = re.compile(r"[a-z]+|\d+(?:[.,]\d+)*")
+
+_NUM = r"(\d+(?:[.,]\d+)*)"
+_UNID = r"\s*(mil|k|milhao|milhoes|mi)?\b"
+_RE_ENTRE = re.compile(rf"(?:entre|de)\s+{_NUM}{_UNID}\s+(?:e|a|ate)\s+{_NUM}{_UNID}")
+_RE_MIN = re.compile(rf"(?:acima de|mais de|a partir de|minimo|no minimo|partir de)\s+{_NUM}{_UNID}")
+_RE_MAX = re.compile(rf"(?:ate|abaixo de|menos de|maximo|no maximo)\s+{_NUM}{_UNID}")
+_RE_SOLTO = re.compile(rf"{_NUM}\s*(mil|k|milhao|milhoes|mi)\b")
+
+_MULT = {"mil": 1_000, "k": 1_000, "milhao": 1_000_000, "milhoes": 1_000_000, "mi": 1_000_000}
+
+# abaixo disso, número sem unidade é quarto, vaga, metragem... não reais
+VALOR_SEM_UNIDADE_MIN = 10_000
+
+
+def normalizar(texto) -> str:
+    """Minúsculas, sem acento, espaços simples."""
+    return " ".join(fold(texto).split())
+
+
+def _numero(raw: str) -> float:
+    # "1.500.000" → 1500000 ; "1,5" → 1.5 ; "450" → 450
+    if raw.count(".") > 1 or ("." in raw and len(raw.split(".")[-1]) == 3 and "," not in raw):
+        raw = raw.replace(".", "")
+    return float(raw.replace(",", "."))
+
+
+def _valor(num: str, unid) -> float:
+    v = _numero(num)
+    return v * _MULT[unid] if unid else v
+
+
+def _preco(num: str, unid):
+    """Valor em reais, ou None se o número não parece preço."""
+    v = _valor(num, unid)
+    return v if unid or v >= VALOR_SEM_UNIDADE_MIN else None
+
+
+def faixa_de_valor(q: str):
+    """(valor_min, valor_max) da mensagem normalizada; None onde não houver."""
+    for m in _RE_ENTRE.finditer(q):
+        n1, u1, n2, u2 = m.groups()
+        # "entre 400 e 600 mil": a unidade do fim vale para os dois
+        a, b = _preco(n1, u1 or u2), _preco(n2, u2 or u1)
+        if a is not None and b is not None:
+            return min(a, b), max(a, b)
+
+    for m in _RE_MIN.finditer(q):
+        v = _preco(*m.groups())
+        if v is not None:
+            return v, None
+
+    for m in _RE_MAX.finditer(q):
+        v = _preco(*m.groups())
+        if v is not None:
+            return None, v
+
+    # "apartamento 600 mil" (sem "até"): lido como teto, como antes
+    m = _RE_SOLTO.search(q)
+    if m:
+        return None, _valor(*m.groups())
+    return None, None
+
+
+class IntentParser:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trie = {}
+        self._nomes = {}
+        self.parse = functools.lru_cache(maxsize=4096)(self._parse)
+        self.compilar((), ())
+
+    # ------------------------------------------------------------
+    # compilação
+    # ------------------------------------------------------------
+
+    def compilar(self, tipos, bairros):
+        """Monta a trie com a base fixa + os tipos e bairros do catálogo."""
+        termos = {}   # frase (tokens) → ("tipo"|"bairro", canônico)
+        nomes = {}    # ("bairro", canônico) → nome para exibir
+
+        def add(frase, campo, canonico):
+            chave = tuple(frase.split())
+            if chave and chave not in termos:
+                termos[chave] = (campo, canonico)
+
+        for canon, nome in TIPOS_BASE.items():
+            add(canon, "tipo", canon)
+            nomes[("tipo", canon)] = nome
+        for canon, nome in BAIRROS_BASE.items():
+            add(canon, "bairro", canon)
+            nomes[("bairro", canon)] = nome
+
+        for tipo in tipos:
+            canon = normalizar(tipo)
+            if canon:
+                add(canon, "tipo", canon)
+                nomes.setdefault(("tipo", canon), tipo.strip().lower())
+
+        grafias = Counter(b.strip() for b in bairros if b and b.strip())
+        palavras = Counter()
+        for bairro, _ in grafias.most_common():
+            canon = normalizar(bairro)
+            add(canon, "bairro", canon)
+            nomes.setdefault(("bairro", canon), bairro)
+            palavras.update(set(canon.split()))
+        # uma palavra do bairro sozinha ("jurere" de "Jurerê Internacional")
+        for p in palavras:
+            if len(p) >= 4 and p not in _GENERICAS:
+                add(p, "bairro", p)
+                nomes.setdefault(("bairro", p), p.capitalize())
+
+        for sin, canon in SINONIMOS.items():
+            campo = "tipo" if canon in TIPOS_BASE else "bairro"
+            add(sin, campo, canon)
+
+        # plurais simples: casas, apartamentos, salas
+        for chave, valor in list(termos.items()):
+            if valor[0] == "tipo" and len(chave) == 1:
+                add(chave[0] + "s", *valor)
+
+        trie = {}
+        for chave, valor in termos.items():
+            no = trie
+            for tok in chave:
+                no = no.setdefault(tok, {})
+            no[None] = valor
+
+        with self._lock:
+            self._trie = trie
+            self._nomes = nomes
+            self.parse = functools.lru_cache(maxsize=4096)(self._parse)
+
+    def nome(self, campo, canonico) -> str:
+        return self._nomes.get((campo, canonico), canonico)
+
+    # ------------------------------------------------------------
+    # interpretação
+    # ------------------------------------------------------------
+
+    def interpretar(self, texto) -> Intencao:
+        return self.parse(normalizar(texto))
+
+    def _parse(self, q: str) -> Intencao:
+        toks = _TOKEN.findall(q)
+        achados = {}
+        i = 0
+        while i < len(toks):
+            no, fim, valor = self._trie, i, None
+            j = i
+            while j < len(toks) and toks[j] in no:
+                no = no[toks[j]]
+                j += 1
+                if None in no:
+                    fim, valor = j, no[None]
+            if valor:
+                achados.setdefault(valor[0], valor[1])
+                i = fim
+            else:
+                i += 1
+
+        valor_min, valor_max = faixa_de_valor(q)
+        return Intencao(achados.get("tipo"), achados.get("bairro"), valor_min, valor_max)
+
+
+parser = IntentParser()
@@ -0,0 +1,165 @@
+# ============================================================
+# brandinho_rank.py
+# ------------------------------------------------------------
+# Ranking das respostas do Brandinho sobre o snapshot do catálogo.
+#
+# O catálogo ativo fica em colunas (NumPy): id, valor e códigos de
+# tipo / bairro. Cada pergunta pontua todos os imóveis numa passada:
+#
+#   score = 4·tipo + 3·bairro + 2·proximidade do valor + 0,5·recência
+#
+# e os k melhores saem de um argpartition (sem ordenar o resto).
+#
+# Restrições: se algum imóvel atende tipo, bairro e faixa de valor, só
+# esses entram. Se nenhum atende a faixa, entram os de tipo/bairro
+# certos com valor até 30% fora dela (resposta "aproximada") — tudo na
+# mesma passada, sem nova consulta.
+#
+# Sem NumPy instalado, o mesmo cálculo roda em Python puro.
+# ============================================================
+
+import heapq
+import math
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+PESO_TIPO = 4.0
+PESO_BAIRRO = 3.0
+PESO_VALOR = 2.0
+PESO_RECENCIA = 0.5
+
+# distância relativa do valor à faixa pedida: score do valor = exp(-d / ESCALA)
+ESCALA_VALOR = 0.15
+TOLERANCIA_VALOR = 0.30
+
+
+def _distancia(valor, valor_min, valor_max):
+    """Distância relativa até a faixa (0 dentro dela)."""
+    if valor_min and valor < valor_min:
+        return (valor_min - valor) / valor_min
+    if valor_max and valor > valor_max:
+        return (valor - valor_max) / valor_max
+    return 0.0
+
+
+class RankingEngine:
+    """Colunas do snapshot: rows = [(id, tipo, bairro, valor, tipo_n, bairro_n)]."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.n = len(self.rows)
+
+        self.tipos = sorted({r[4] for r in self.rows})
+        self.bairros = sorted({r[5] for r in self.rows})
+        t_idx = {t: i for i, t in enumerate(self.tipos)}
+        b_idx = {b: i for i, b in enumerate(self.bairros)}
+
+        ids = [r[0] for r in self.rows]
+        lo, hi = (min(ids), max(ids)) if ids else (0, 0)
+        span = (hi - lo) or 1
+
+        if np is not None:
+            self.valor = np.array([r[3] for r in self.rows], dtype=np.float64)
+            self.tipo_cod = np.array([t_idx[r[4]] for r in self.rows], dtype=np.int32)
+            self.bairro_cod = np.array([b_idx[r[5]] for r in self.rows], dtype=np.int32)
+            self.recencia = (np.array(ids, dtype=np.float64) - lo) / span
+        else:
+            self.valor = [r[3] for r in self.rows]
+            self.tipo_cod = [t_idx[r[4]] for r in self.rows]
+            self.bairro_cod = [b_idx[r[5]] for r in self.rows]
+            self.recencia = [(i - lo) / span for i in ids]
+
+    @staticmethod
+    def _contem(vocab, termo):
+        """Para cada valor distinto: o termo pedido está contido nele?"""
+        return [termo in v for v in vocab]
+
+    def top(self, intencao, k: int = 5):
+        """
+        Retorna (linhas, aproximado): até k linhas do snapshot, melhores
+        primeiro. aproximado=True quando nada atende a faixa de valor e
+        foram usados valores próximos.
+        """
+        if not self.n:
+            return [], False
+        if np is not None:
+            return self._top_numpy(intencao, k)
+        return self._top_python(intencao, k)
+
+    # ------------------------------------------------------------
+    # NumPy
+    # ------------------------------------------------------------
+
+    def _top_numpy(self, it, k):
+        ok = np.ones(self.n, dtype=bool)
+        score = PESO_RECENCIA * self.recencia
+
+        if it.tipo:
+            m = np.array(self._contem(self.tipos, it.tipo), dtype=bool)[self.tipo_cod]
+            ok &= m
+            score = score + PESO_TIPO * m
+        if it.bairro:
+            m = np.array(self._contem(self.bairros, it.bairro), dtype=bool)[self.bairro_cod]
+            ok &= m
+            score = score + PESO_BAIRRO * m
+
+        aproximado = False
+        if it.valor_min or it.valor_max:
+            d = np.zeros(self.n)
+            if it.valor_min:
+                d = np.maximum(d, (it.valor_min - self.valor) / it.valor_min)
+            if it.valor_max:
+                d = np.maximum(d, (self.valor - it.valor_max) / it.valor_max)
+            score = score + PESO_VALOR * np.exp(-d / ESCALA_VALOR)
+
+            exato = ok & (d <= 0)
+            if exato.any():
+                ok = exato
+            else:
+                ok &= d <= TOLERANCIA_VALOR
+                aproximado = True
+
+        idx = np.flatnonzero(ok)
+        if not idx.size:
+            return [], False
+        if idx.size > k:
+            part = np.argpartition(-score[idx], k - 1)[:k]
+            idx = idx[part]
+        idx = idx[np.argsort(-score[idx], kind="stable")]
+        return [self.rows[i] for i in idx.tolist()], aproximado
+
+    # ------------------------------------------------------------
+    # Python puro (sem NumPy)
+    # ------------------------------------------------------------
+
+    def _top_python(self, it, k):
+        tipo_ok = self._contem(self.tipos, it.tipo) if it.tipo else None
+        bairro_ok = self._contem(self.bairros, it.bairro) if it.bairro else None
+        tem_faixa = bool(it.valor_min or it.valor_max)
+
+        exatos, proximos = [], []
+        for i in range(self.n):
+            score = PESO_RECENCIA * self.recencia[i]
+            if tipo_ok is not None:
+                if not tipo_ok[self.tipo_cod[i]]:
+                    continue
+                score += PESO_TIPO
+            if bairro_ok is not None:
+                if not bairro_ok[self.bairro_cod[i]]:
+                    continue
+                score += PESO_BAIRRO
+            if tem_faixa:
+                d = _distancia(self.valor[i], it.valor_min, it.valor_max)
+                score += PESO_VALOR * math.exp(-d / ESCALA_VALOR)
+                if d > 0:
+                    if d <= TOLERANCIA_VALOR:
+                        proximos.append((score, i))
+                    continue
+            exatos.append((score, i))
+
+        aproximado = tem_faixa and not exatos
+        escolhidos = heapq.nlargest(k, proximos if aproximado else exatos)
+        return [self.rows[i] for _, i in escolhidos], aproximado and bool(escolhidos)
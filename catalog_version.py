@@ -0,0 +1,48 @@
+# ============================================================
+# catalog_version.py
+# ------------------------------------------------------------
+# Número de versão do catálogo, compartilhado entre os workers do
+# gunicorn por um arquivo local. Toda escrita do admin que muda o que
+# o público vê chama bump(); caches e índices em memória comparam a
+# versão com a que usaram para montar o que têm e se refazem se mudou.
+#
+# Ler a versão é um read() de poucos bytes — não toca o MySQL.
+# ============================================================
+
+import fcntl
+import os
+
+import config
+
+
+def _path() -> str:
+    return config.CATALOG_VERSION_FILE
+
+
+def current() -> int:
+    try:
+        with open(_path(), "r") as fh:
+            return int(fh.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump() -> int:
+    """Incrementa a versão (com lock entre processos) e devolve a nova."""
+    path = _path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a+") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            fh.seek(0)
+            try:
+                versao = int(fh.read().strip() or 0) + 1
+            except ValueError:
+                versao = 1
+            fh.seek(0)
+            fh.truncate()
+            fh.write(str(versao))
+            fh.flush()
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+    return versao
@@ -0,0 +1,168 @@
+# ============================================================
+# change_feed.py
+# ------------------------------------------------------------
+# Feed de mudanças para sincronização (portais, backups):
+# "tudo que mudou desde o cursor X", em vez do /admin/export inteiro.
+#
+# - Imovel, ImovelFoto, Lead e Servico têm atualizado_em (default e
+#   onupdate no modelo; o import em lote grava explicitamente).
+# - DELETE pelo ORM grava uma Remocao (tombstone) na mesma transação
+#   (eventos after_delete abaixo).
+# - delta(entidade, cursor) lê as duas fontes em keyset por
+#   (carimbo, id) e devolve itens "alterado" / "removido" em ordem, mais
+#   o cursor do último item entregue.
+#
+# Só entram mudanças com mais de DELTA_LAG_S segundos: uma transação
+# que carimbou antes e ainda não fez commit não fica para trás do cursor.
+# ============================================================
+
+import heapq
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import and_, event, or_
+
+import config
+from models import db, Imovel, ImovelFoto, Lead, Remocao, Servico
+
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+_FMT_CURSOR = "%Y%m%dT%H%M%S.%f"
+
+# entidade → (modelo, colunas entregues)
+ENTIDADES = {
+    "imoveis": (Imovel, ("id", "codigo", "tipo", "valor", "bairro", "descricao",
+                         "status", "finalidade", "imagem")),
+    "fotos": (ImovelFoto, ("id", "imovel_id", "mimetype", "sha256", "tamanho",
+                           "is_capa", "status", "criado_em")),
+    "leads": (Lead, ("id", "nome", "telefone", "mensagem", "imovel_id", "data")),
+    "servicos": (Servico, ("id", "nome_cliente", "telefone", "imovel_id", "tipo_servico",
+                           "descricao", "data_solicitacao", "data_agendamento",
+                           "responsavel", "custo", "materiais", "status")),
+}
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+# ============================================================
+# TOMBSTONES
+# ============================================================
+
+def _registrar_remocao(entidade):
+    def listener(mapper, connection, target):
+        connection.execute(Remocao.__table__.insert().values(
+            entidade=entidade,
+            registro_id=target.id,
+            codigo=getattr(target, "codigo", None),
+            removido_em=datetime.utcnow(),
+        ))
+    return listener
+
+
+for _nome, (_modelo, _) in ENTIDADES.items():
+    event.listen(_modelo, "after_delete", _registrar_remocao(_nome))
+
+
+# ============================================================
+# CURSOR
+# ============================================================
+
+def formatar_cursor(carimbo: datetime, registro_id: int) -> str:
+    return f"{carimbo.strftime(_FMT_CURSOR)}_{registro_id}"
+
+
+def parse_cursor(raw):
+    """'20261018T130137.259000_42' → (datetime, 42); vazio → None."""
+    if not raw:
+        return None
+    try:
+        carimbo, registro_id = raw.rsplit("_", 1)
+        return datetime.strptime(carimbo, _FMT_CURSOR), int(registro_id)
+    except ValueError:
+        raise CursorInvalido(f"cursor inválido: {raw!r}")
+
+
+def parse_limit(raw) -> int:
+    try:
+        n = int(raw)
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return max(1, min(n, MAX_PAGE_SIZE))
+
+
+def _depois(carimbo_col, id_col, cursor):
+    carimbo, registro_id = cursor
+    return or_(carimbo_col > carimbo, and_(carimbo_col == carimbo, id_col > registro_id))
+
+
+# ============================================================
+# DELTA
+# ============================================================
+
+def _valor(v):
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, Decimal):
+        return float(v)
+    return v
+
+
+def serializar(item: dict) -> dict:
+    """Datas em ISO 8601 (com microssegundos) e Decimal em número, para JSON/CSV."""
+    return {k: _valor(v) for k, v in item.items()}
+
+
+def colunas(entidade) -> list:
+    """Cabeçalho do CSV: acao + colunas da entidade + atualizado_em."""
+    return ["acao", *ENTIDADES[entidade][1], "atualizado_em"]
+
+
+def delta(entidade: str, cursor=None, limit: int = PAGE_SIZE):
+    """
+    Retorna (itens, proximo_cursor, tem_mais). Sem mudanças novas,
+    proximo_cursor é o próprio cursor recebido (a sincronização guarda e
+    repete).
+    """
+    modelo, nomes = ENTIDADES[entidade]
+    limite = datetime.utcnow() - timedelta(seconds=config.DELTA_LAG_S)
+
+    q = (
+        db.session.query(*[getattr(modelo, c) for c in nomes], modelo.atualizado_em)
+        .filter(modelo.atualizado_em <= limite)
+    )
+    r = (
+        db.session.query(Remocao.registro_id, Remocao.codigo, Remocao.removido_em)
+        .filter(Remocao.entidade == entidade, Remocao.removido_em <= limite)
+    )
+    if cursor:
+        q = q.filter(_depois(modelo.atualizado_em, modelo.id, cursor))
+        r = r.filter(_depois(Remocao.removido_em, Remocao.registro_id, cursor))
+
+    alterados = (
+        ((row.atualizado_em, row.id), "alterado", row)
+        for row in q.order_by(modelo.atualizado_em, modelo.id).limit(limit + 1)
+    )
+    removidos = (
+        ((row.removido_em, row.registro_id), "removido", row)
+        for row in r.order_by(Remocao.removido_em, Remocao.registro_id).limit(limit + 1)
+    )
+
+    itens, ultimo = [], None
+    for chave, acao, row in heapq.merge(alterados, removidos, key=lambda x: x[0]):
+        if len(itens) == limit:
+            return itens, formatar_cursor(*ultimo), True
+        if acao == "alterado":
+            item = {"acao": acao, **{c: getattr(row, c) for c in nomes}}
+        else:
+            item = {"acao": acao, "id": row.registro_id}
+            if "codigo" in nomes:
+                item["codigo"] = row.codigo
+        item["atualizado_em"] = chave[0]
+        itens.append(item)
+        ultimo = chave
+
+    proximo = formatar_cursor(*ultimo) if ultimo else (formatar_cursor(*cursor) if cursor else None)
+    return itens, proximo, False
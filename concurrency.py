@@ -0,0 +1,157 @@
+# ============================================================
+# concurrency.py
+# ------------------------------------------------------------
+# Limite de requisições simultâneas por classe de rota, para que uma
+# rajada de /foto/<id> (página cheia de imagens) não ocupe todas as
+# conexões do pool do MySQL e deixe /lead e /admin esperando.
+#
+# Cada classe (fotos, publico, chat, admin, lead) tem:
+#   limite  → quantas requisições rodam ao mesmo tempo
+#   fila    → quantas podem esperar por uma vaga
+#   espera  → quanto tempo (s) esperam antes de desistir
+# Fila cheia ou espera estourada → 503 com Retry-After, na hora.
+#
+# Os limites são por worker, assim como o pool do SQLAlchemy; a soma
+# deles cabe no pool (5 + 10 de overflow), e "lead" tem vagas próprias.
+# Só atuam com worker de várias threads (gthread, gunicorn.conf.py): num
+# worker sync as requisições já são uma de cada vez.
+# ============================================================
+
+import threading
+import time
+
+from flask import Response, g, request
+
+import config
+
+# endpoint Flask → classe; admin* cai em "admin", o resto não é limitado
+ENDPOINTS = {
+    "foto_blob": "fotos",
+    "foto_variante": "fotos",
+    "home": "publico",
+    "temporada": "publico",
+    "imovel_detalhe": "publico",
+    "api_imoveis": "publico",
+    "api_busca": "publico",
+    "api_brandinho": "chat",
+    # /servicos (GET lista todos os imóveis ativos) fica em "publico": as
+    # vagas de "lead" são só do POST /lead
+    "servicos": "publico",
+    "lead": "lead",
+    "set_capa": "admin",
+    "remove_foto": "admin",
+}
+
+
+class Budget:
+
+    def __init__(self, nome: str, limite: int, fila: int, espera: float):
+        self.nome = nome
+        self.limite = limite
+        self.fila = fila
+        self.espera = espera
+
+        self._cond = threading.Condition()
+        self.ativos = 0
+        self.esperando = 0
+        self.stats = {"admitidas": 0, "rejeitadas_fila": 0, "rejeitadas_espera": 0,
+                      "fila_max": 0, "espera_ms_total": 0.0}
+
+    def acquire(self) -> bool:
+        with self._cond:
+            if self.ativos < self.limite and not self.esperando:
+                self.ativos += 1
+                self.stats["admitidas"] += 1
+                return True
+
+            if self.esperando >= self.fila:
+                self.stats["rejeitadas_fila"] += 1
+                return False
+
+            self.esperando += 1
+            self.stats["fila_max"] = max(self.stats["fila_max"], self.esperando)
+            t0 = time.monotonic()
+            fim = t0 + self.espera
+            try:
+                while self.ativos >= self.limite:
+                    resta = fim - time.monotonic()
+                    if resta <= 0:
+                        self.stats["rejeitadas_espera"] += 1
+                        return False
+                    self._cond.wait(resta)
+            finally:
+                self.esperando -= 1
+                self.stats["espera_ms_total"] += (time.monotonic() - t0) * 1000
+
+            self.ativos += 1
+            self.stats["admitidas"] += 1
+            return True
+
+    def release(self):
+        with self._cond:
+            self.ativos -= 1
+            self._cond.notify()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            s = dict(self.stats)
+            s.update(limite=self.limite, fila=self.fila, espera_s=self.espera,
+                     ativos=self.ativos, esperando=self.esperando)
+        s["rejeitadas"] = s["rejeitadas_fila"] + s["rejeitadas_espera"]
+        s["espera_ms_total"] = round(s["espera_ms_total"], 2)
+        return s
+
+
+def parse_budgets(raw: str) -> dict:
+    """'fotos=4:16:1,lead=2:10:10' → {nome: Budget}."""
+    budgets = {}
+    for parte in (raw or "").split(","):
+        if "=" not in parte:
+            continue
+        nome, valores = parte.split("=", 1)
+        limite, fila, espera = (valores.split(":") + ["0", "1"])[:3]
+        budgets[nome.strip()] = Budget(nome.strip(), int(limite), int(fila), float(espera))
+    return budgets
+
+
+budgets = parse_budgets(config.CONCURRENCY_BUDGETS)
+
+
+def classe(endpoint):
+    if not endpoint:
+        return None
+    if endpoint in ENDPOINTS:
+        return ENDPOINTS[endpoint]
+    if endpoint.startswith("admin"):
+        return "admin"
+    return None
+
+
+def _antes():
+    budget = budgets.get(classe(request.endpoint))
+    if budget is None:
+        return None
+    if not budget.acquire():
+        resp = Response(
+            "Servidor ocupado no momento, tente novamente em instantes.",
+            status=503, mimetype="text/plain",
+        )
+        resp.headers["Retry-After"] = str(config.CONCURRENCY_RETRY_AFTER_S)
+        return resp
+    g.concurrency_budget = budget
+    return None
+
+
+def _depois(exc=None):
+    budget = g.pop("concurrency_budget", None)
+    if budget is not None:
+        budget.release()
+
+
+def init_app(app):
+    app.before_request(_antes)
+    app.teardown_request(_depois)
+
+
+def snapshot() -> dict:
+    return {nome: b.snapshot() for nome, b in budgets.items()}
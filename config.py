@@ -1,4 +1,5 @@
 import os
+import tempfile
 from urllib.parse import quote_plus
 
 DB_USER = os.getenv("DB_USER")
@@ -16,3 +17,81 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 # 🔐 senha vem do Render (ADMIN_PASSWORD)
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "@13Lorenzo")
+
+# Fotos são imutáveis (trocar foto = novo id), então o cache HTTP pode ser longo
+FOTO_CACHE_MAX_AGE = int(os.getenv("FOTO_CACHE_MAX_AGE", str(365 * 24 * 3600)))
+
+# Armazenamento das fotos: "blob" (MySQL, legado) ou "fs" (diretório endereçado
+# por sha256). No Render, "fs" exige um disco persistente montado em PHOTO_STORAGE_DIR.
+PHOTO_STORAGE = os.getenv("PHOTO_STORAGE", "blob")
+PHOTO_STORAGE_DIR = os.getenv(
+    "PHOTO_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "fotos"),
+)
+
+# Cache das fotos BLOB: LRU em memória por worker + diretório compartilhado
+PHOTO_CACHE_MEM_MB = int(os.getenv("PHOTO_CACHE_MEM_MB", "32"))
+PHOTO_CACHE_MAX_ITEM_MB = int(os.getenv("PHOTO_CACHE_MAX_ITEM_MB", "4"))
+PHOTO_CACHE_DISK_MB = int(os.getenv("PHOTO_CACHE_DISK_MB", "512"))
+PHOTO_CACHE_DIR = os.getenv(
+    "PHOTO_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "brando-fotos-cache"),
+)
+
+# Upload de fotos (admin_save): limite por arquivo e por requisição inteira
+UPLOAD_MAX_FILE_MB = int(os.getenv("UPLOAD_MAX_FILE_MB", "15"))
+UPLOAD_MAX_REQUEST_MB = int(os.getenv("UPLOAD_MAX_REQUEST_MB", "150"))
+UPLOAD_SPOOL_KB = int(os.getenv("UPLOAD_SPOOL_KB", "1024"))
+# /admin/import (planilha ou ZIP de fotos): limite próprio da requisição;
+# cada foto do ZIP continua limitada a UPLOAD_MAX_FILE_MB
+IMPORT_MAX_REQUEST_MB = int(os.getenv("IMPORT_MAX_REQUEST_MB", "2048"))
+
+# Processamento das fotos enviadas (decode, EXIF, recompressão, variantes)
+# num pool de processos. 0 = processa na própria requisição.
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+UPLOAD_STAGING_DIR = os.getenv(
+    "UPLOAD_STAGING_DIR",
+    os.path.join(tempfile.gettempdir(), "brando-uploads"),
+)
+
+# Versão do catálogo compartilhada entre os workers (caches / índice de busca)
+CATALOG_VERSION_FILE = os.getenv(
+    "CATALOG_VERSION_FILE",
+    os.path.join(tempfile.gettempdir(), "brando-catalogo.version"),
+)
+
+# Cache das páginas públicas (/, /temporada, /imovel/<id>) e dos cards,
+# por worker, invalidado pela versão do catálogo. 0 desliga.
+PAGE_CACHE_MB = int(os.getenv("PAGE_CACHE_MB", "32"))
+
+# Import da planilha (/admin/import): linhas por lote — um SELECT dos
+# códigos existentes + um upsert + um commit por lote.
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+
+# Jobs de import em segundo plano: threads por worker (0 = roda na
+# própria requisição) e pasta do upload + estado de cada job.
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "1"))
+IMPORT_JOBS_DIR = os.getenv(
+    "IMPORT_JOBS_DIR",
+    os.path.join(tempfile.gettempdir(), "brando-imports"),
+)
+# ZIP de fotos no import: fotos por commit (cada lote vai para o pool de imagens)
+IMPORT_FOTOS_BATCH = int(os.getenv("IMPORT_FOTOS_BATCH", "20"))
+
+# Feed de mudanças (/admin/delta): mudanças mais novas que DELTA_LAG_S
+# segundos ficam para a próxima leitura (transações ainda abertas).
+# DELTA_TOKEN permite sincronizar sem login (Authorization: Bearer <token>);
+# vazio = só com a sessão do admin.
+DELTA_LAG_S = int(os.getenv("DELTA_LAG_S", "5"))
+DELTA_TOKEN = os.getenv("DELTA_TOKEN", "")
+
+# Orçamento de requisições simultâneas por classe de rota (por worker),
+# "classe=limite:fila:espera_s". A soma dos limites não passa do pool do
+# banco (pool_size 5 + max_overflow 10); "lead" tem vagas só dela.
+# A soma de limite + fila (31) cabe nas threads do worker gthread
+# (GUNICORN_THREADS=32, gunicorn.conf.py): quem espera também ocupa thread.
+CONCURRENCY_BUDGETS = os.getenv(
+    "CONCURRENCY_BUDGETS",
+    "fotos=4:4:1,publico=4:4:2,chat=2:2:1,admin=3:2:5,lead=2:4:10",
+)
+CONCURRENCY_RETRY_AFTER_S = int(os.getenv("CONCURRENCY_RETRY_AFTER_S", "2"))
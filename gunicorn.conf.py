@@ -0,0 +1,21 @@
+# ============================================================
+# gunicorn.conf.py
+# ------------------------------------------------------------
+# Lido automaticamente pelo gunicorn (Procfile e Start Command do
+# Render: `gunicorn app:app`).
+#
+# Workers gthread: cada worker atende até GUNICORN_THREADS requisições
+# ao mesmo tempo. Os orçamentos de concurrency.py são por worker e só
+# funcionam assim — num worker sync (uma thread) nenhuma requisição
+# espera outra e o limite por classe nunca atua.
+#
+# Regra de dimensionamento: threads ≥ soma de (limite + fila) de
+# CONCURRENCY_BUDGETS. Quem espera na fila também ocupa uma thread;
+# com essa folga, uma rajada de /foto não toma as threads que "lead"
+# precisa. Os padrões somam 31 (config.py).
+# ============================================================
+
+import os
+
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "32"))
@@ -0,0 +1,213 @@
+# ============================================================
+# image_pipeline.py
+# ------------------------------------------------------------
+# Gera as variantes redimensionadas das fotos (uma vez, no upload):
+#   - thumb   → tabela do admin / miniaturas da galeria
+#   - card    → cards da listagem pública
+#   - detalhe → carrossel da página do imóvel
+# Cada variante sai em JPEG e, se o Pillow suportar, em WebP.
+#
+# processar_upload() é a etapa pesada (decode, orientação EXIF, remoção
+# de metadados, recompressão, variantes). Roda no pool de processos do
+# upload_pipeline e não acessa o banco.
+# ============================================================
+
+import io
+import logging
+
+import photo_storage
+from models import db, ImovelFoto, ImovelFotoVariante
+
+try:
+    from PIL import Image, ImageOps, features as pil_features
+except Exception:
+    Image = None
+    ImageOps = None
+    pil_features = None
+
+log = logging.getLogger(__name__)
+
+# largura máxima (px) de cada variante
+VARIANTES = {
+    "thumb": 160,
+    "card": 640,
+    "detalhe": 1280,
+}
+
+QUALIDADE = {"jpeg": 82, "webp": 78}
+
+MIMETYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+# assinaturas aceitas (mesmo conjunto de ALLOWED_EXTENSIONS do app)
+MAGIC = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+def disponivel() -> bool:
+    return Image is not None
+
+
+def formatos() -> list:
+    if pil_features is not None and pil_features.check("webp"):
+        return ["jpeg", "webp"]
+    return ["jpeg"]
+
+
+def detectar_mimetype(cabecalho: bytes):
+    """Mimetype pelos magic bytes do arquivo; None se não for imagem aceita."""
+    for assinatura, mimetype in MAGIC:
+        if cabecalho.startswith(assinatura):
+            return mimetype
+    return None
+
+
+def normalizar_original(dados: bytes, mimetype: str) -> bytes:
+    """
+    Aplica a orientação EXIF e regrava sem metadados (EXIF/GPS).
+    GIF fica como está (pode ser animado).
+    """
+    if mimetype == "image/gif":
+        return dados
+
+    with Image.open(io.BytesIO(dados)) as im:
+        icc = im.info.get("icc_profile")
+        im = ImageOps.exif_transpose(im)
+        buf = io.BytesIO()
+        if mimetype == "image/jpeg":
+            if im.mode not in ("RGB", "L"):
+                im = im.convert("RGB")
+            im.save(buf, format="JPEG", quality=90, optimize=True,
+                    progressive=True, icc_profile=icc)
+        else:
+            im.save(buf, format="PNG", optimize=True, icc_profile=icc)
+        return buf.getvalue()
+
+
+def processar_upload(caminho: str) -> dict:
+    """
+    Etapa executada no pool de processos. Recebe o arquivo em staging e
+    devolve {"mimetype", "conteudo", "variantes"} ou {"erro"}.
+    """
+    with open(caminho, "rb") as fh:
+        dados = fh.read()
+
+    mimetype = detectar_mimetype(dados[:16])
+    if not mimetype:
+        return {"erro": "formato de imagem não reconhecido"}
+
+    if not disponivel():
+        return {"mimetype": mimetype, "conteudo": dados, "variantes": []}
+
+    try:
+        with Image.open(io.BytesIO(dados)) as im:
+            im.verify()
+        conteudo = normalizar_original(dados, mimetype)
+        variantes = gerar_variantes(conteudo)
+    except Exception as e:
+        return {"erro": f"imagem inválida: {e}"}
+
+    return {"mimetype": mimetype, "conteudo": conteudo, "variantes": variantes}
+
+
+def gerar_variantes(conteudo) -> list:
+    """
+    Retorna uma lista de dicts (variante, formato, conteudo, mimetype,
+    largura, altura). Nunca aumenta a imagem; corrige orientação EXIF.
+    `conteudo` pode ser bytes ou um arquivo aberto.
+    """
+    if not disponivel():
+        return []
+
+    fonte = io.BytesIO(conteudo) if isinstance(conteudo, bytes) else conteudo
+    with Image.open(fonte) as im:
+        im = ImageOps.exif_transpose(im)
+        if im.mode not in ("RGB", "L"):
+            im = im.convert("RGB")
+
+        out = []
+        for nome, largura in VARIANTES.items():
+            copia = im.copy()
+            copia.thumbnail((largura, largura * 4), Image.LANCZOS)
+
+            for fmt in formatos():
+                buf = io.BytesIO()
+                opts = {"quality": QUALIDADE[fmt]}
+                if fmt == "jpeg":
+                    opts.update(optimize=True, progressive=True)
+                copia.save(buf, format=fmt.upper(), **opts)
+                out.append({
+                    "variante": nome,
+                    "formato": fmt,
+                    "conteudo": buf.getvalue(),
+                    "mimetype": MIMETYPES[fmt],
+                    "largura": copia.width,
+                    "altura": copia.height,
+                })
+        return out
+
+
+def criar_variantes(foto: ImovelFoto, conteudo) -> int:
+    """
+    Anexa as variantes à foto (ainda não commitada). Se a imagem não
+    puder ser decodificada, registra e segue: a foto original continua
+    sendo servida como fallback.
+    """
+    try:
+        geradas = gerar_variantes(conteudo)
+    except Exception as e:
+        log.warning(f"⚠️ Não foi possível gerar variantes da foto: {e}")
+        return 0
+
+    return anexar_variantes(foto, geradas)
+
+
+def anexar_variantes(foto: ImovelFoto, geradas: list) -> int:
+    """Grava (storage) e anexa à foto as variantes já geradas."""
+    for v in geradas:
+        variante = ImovelFotoVariante(
+            variante=v["variante"],
+            formato=v["formato"],
+            mimetype=v["mimetype"],
+            largura=v["largura"],
+            altura=v["altura"],
+        )
+        photo_storage.store(variante, v["conteudo"])
+        foto.variantes.append(variante)
+    return len(geradas)
+
+
+def backfill_variantes(log=print) -> int:
+    """
+    Gera variantes para fotos antigas que ainda não têm nenhuma.
+    Uma foto por vez: um BLOB em memória, um commit por foto.
+    """
+    if not disponivel():
+        log("Pillow não está instalado. Adicione no requirements.txt")
+        return 0
+
+    sem_variantes = ~db.exists().where(ImovelFotoVariante.foto_id == ImovelFoto.id)
+    feitas, last_id = 0, 0
+
+    while True:
+        foto = (
+            ImovelFoto.query
+            .filter(ImovelFoto.id > last_id, sem_variantes)
+            .order_by(ImovelFoto.id)
+            .first()
+        )
+        if foto is None:
+            break
+        last_id = foto.id
+
+        n = criar_variantes(foto, photo_storage.read(foto) or b"")
+        db.session.commit()
+        db.session.expunge_all()
+        if n:
+            feitas += 1
+            log(f"🖼️  Foto {last_id}: {n} variantes")
+
+    return feitas
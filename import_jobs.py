@@ -0,0 +1,281 @@
+# ============================================================
+# import_jobs.py
+# ------------------------------------------------------------
+# Import de planilha (ou ZIP de fotos, photo_import.py) em segundo plano.
+#
+#   admin_import → salva o upload em IMPORT_JOBS_DIR/<id>.upload
+#                → confere o cabeçalho (400 na hora se faltar coluna)
+#                  ou se o ZIP é válido
+#                → criar(...) devolve o id do job (resposta imediata)
+#   pool de threads → importer.validar + importer.importar em lotes,
+#                gravando o progresso em IMPORT_JOBS_DIR/<id>.json
+#   GET  /admin/import/<id>          → estado + contagens + erros por linha
+#   POST /admin/import/<id>/cancelar → o job para no fim do lote atual
+#                (os lotes já gravados ficam)
+#
+# O estado fica em arquivo (como catalog_version) para que qualquer
+# worker do gunicorn responda o progresso e o cancelamento.
+# Simulação (dry_run): valida e conta inseridos/atualizados sem gravar.
+# IMPORT_WORKERS=0 roda o job na própria requisição (dev).
+# ============================================================
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import catalog_version
+import config
+import importer
+import listing
+import photo_import
+from models import db
+
+log = logging.getLogger(__name__)
+
+# erros por linha guardados no relatório (o total é sempre contado)
+MAX_ERROS = 1000
+
+# jobs terminados há mais que isso são apagados quando um novo é criado
+TTL_S = 24 * 3600
+
+FINAIS = ("concluido", "cancelado", "erro")
+
+_app = None
+_pool = None
+_lock = threading.Lock()
+
+
+class Cancelado(Exception):
+    pass
+
+
+def init_app(app):
+    global _app
+    _app = app
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=config.IMPORT_WORKERS, thread_name_prefix="import")
+        return _pool
+
+
+# ============================================================
+# ESTADO (arquivos em IMPORT_JOBS_DIR)
+# ============================================================
+
+def _path(job_id: str, ext: str) -> str:
+    return os.path.join(config.IMPORT_JOBS_DIR, f"{job_id}.{ext}")
+
+
+def _valido(job_id) -> bool:
+    return bool(job_id) and len(job_id) == 32 and all(c in "0123456789abcdef" for c in job_id)
+
+
+def _salvar(job: dict):
+    job["atualizado_em"] = time.time()
+    tmp = _path(job["id"], "json.tmp")
+    with open(tmp, "w") as fh:
+        json.dump(job, fh, ensure_ascii=False)
+    os.replace(tmp, _path(job["id"], "json"))
+
+
+def estado(job_id: str):
+    """Estado do job (dict) ou None se não existir."""
+    if not _valido(job_id):
+        return None
+    try:
+        with open(_path(job_id, "json")) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def cancelar(job_id: str):
+    """Pede o cancelamento; o job confere a marca a cada lote."""
+    job = estado(job_id)
+    if job and job["status"] not in FINAIS:
+        open(_path(job_id, "cancel"), "w").close()
+        job["cancelamento_pedido"] = True
+    return job
+
+
+def _cancelado(job_id) -> bool:
+    return os.path.exists(_path(job_id, "cancel"))
+
+
+def _limpar_antigos():
+    limite = time.time() - TTL_S
+    try:
+        nomes = os.listdir(config.IMPORT_JOBS_DIR)
+    except OSError:
+        return
+    for nome in nomes:
+        caminho = os.path.join(config.IMPORT_JOBS_DIR, nome)
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.unlink(caminho)
+        except OSError:
+            pass
+
+
+# ============================================================
+# CRIAÇÃO
+# ============================================================
+
+def _leitor(formato: str, fh):
+    return importer.ler_xlsx(fh) if formato == "xlsx" else importer.ler_csv(fh)
+
+
+def criar(upload, formato: str, arquivo: str, dry_run: bool = False) -> str:
+    """
+    Guarda o upload e agenda o job. Levanta importer.PlanilhaInvalida
+    (sem criar o job) se o cabeçalho não tiver as colunas obrigatórias,
+    ou photo_import.ZipInvalido se formato='zip' e o arquivo não for ZIP.
+    """
+    os.makedirs(config.IMPORT_JOBS_DIR, exist_ok=True)
+    _limpar_antigos()
+
+    job_id = uuid.uuid4().hex
+    caminho = _path(job_id, "upload")
+    upload.seek(0)
+    with open(caminho, "wb") as out:
+        shutil.copyfileobj(upload, out, 1024 * 1024)
+
+    try:
+        with open(caminho, "rb") as fh:
+            if formato == "zip":
+                photo_import.conferir(fh)
+            else:
+                leitor = _leitor(formato, fh)
+                try:
+                    next(leitor, None)   # lê o cabeçalho (e a 1ª linha)
+                finally:
+                    leitor.close()
+    except (importer.PlanilhaInvalida, photo_import.ZipInvalido):
+        os.unlink(caminho)
+        raise
+
+    _salvar({
+        "id": job_id,
+        "arquivo": arquivo,
+        "formato": formato,
+        "dry_run": bool(dry_run),
+        "status": "na_fila",
+        "mensagem": None,
+        "criado_em": time.time(),
+        "lidas": 0,
+        "validadas": 0,
+        "com_erro": 0,
+        "erros_total": 0,
+        "gravadas": 0,
+        "resultado": None,
+        "erros": [],
+    })
+
+    if config.IMPORT_WORKERS <= 0:
+        _executar(job_id)
+    else:
+        _get_pool().submit(_executar_no_app, job_id)
+    return job_id
+
+
+# ============================================================
+# EXECUÇÃO
+# ============================================================
+
+def _executar_no_app(job_id):
+    with _app.app_context():
+        try:
+            _executar(job_id)
+        finally:
+            db.session.remove()
+
+
+def _executar(job_id):
+    job = estado(job_id)
+    job["status"] = "rodando"
+    _salvar(job)
+
+    def ao_erro(linha, codigo, campo, mensagem):
+        job["erros_total"] += 1
+        if len(job["erros"]) < MAX_ERROS:
+            job["erros"].append({"linha": linha, "codigo": codigo, "campo": campo, "mensagem": mensagem})
+
+    def contados(registros):
+        for reg in registros:
+            job["lidas"] += 1
+            if reg["ok"]:
+                job["validadas"] += 1
+            else:
+                job["com_erro"] += 1
+            yield reg
+
+    def ao_lido(ok):
+        job["lidas"] += 1
+        job["validadas" if ok else "com_erro"] += 1
+
+    def ao_lote(res):
+        job["resultado"] = dict(res)
+        if not job["dry_run"]:
+            job["gravadas"] = res["inseridos"] + res.get("atualizados", 0)
+        _salvar(job)
+        if _cancelado(job_id):
+            raise Cancelado()
+
+    gravou = False
+    try:
+        with open(_path(job_id, "upload"), "rb") as fh:
+            if job["formato"] == "zip":
+                res = photo_import.importar_zip(
+                    fh, gravar=not job["dry_run"], ao_erro=ao_erro, ao_lido=ao_lido, ao_lote=ao_lote,
+                )
+            else:
+                registros = contados(importer.validar(_leitor(job["formato"], fh), ao_erro))
+                res = importer.importar(registros, gravar=not job["dry_run"], ao_lote=ao_lote)
+        job["resultado"] = res
+        if not job["dry_run"]:
+            job["gravadas"] = res["inseridos"] + res.get("atualizados", 0)
+        job["status"] = "concluido"
+        gravou = not job["dry_run"]
+    except Cancelado:
+        db.session.rollback()
+        job["status"] = "cancelado"
+        gravou = not job["dry_run"] and job["gravadas"] > 0
+    except Exception as e:
+        db.session.rollback()
+        log.exception(f"❌ Import {job_id} falhou")
+        job["status"] = "erro"
+        job["mensagem"] = str(e)
+        gravou = not job["dry_run"] and job["gravadas"] > 0
+    finally:
+        for ext in ("upload", "cancel"):
+            try:
+                os.unlink(_path(job_id, ext))
+            except OSError:
+                pass
+
+    # ZIP de fotos: photo_import já refez os cards dos imóveis tocados
+    if gravou and job["formato"] != "zip":
+        try:
+            # mesmo efeito de app.catalogo_alterado(incremental=False)
+            listing.reconstruir_cards()
+            catalog_version.bump()
+        except Exception as e:
+            db.session.rollback()
+            log.error(f"❌ Import {job_id}: falha ao refazer os cards: {e}")
+
+    _salvar(job)
+    r = job["resultado"] or {}
+    log.info(
+        f"✅ Import {job_id} ({job['formato']}{', simulação' if job['dry_run'] else ''}) {job['status']}: "
+        f"{r.get('inseridos', 0)} inseridos, {r.get('atualizados', 0)} atualizados, "
+        f"{r.get('inalterados', 0)} sem mudança, {job['com_erro']} linhas com erro"
+    )
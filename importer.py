@@ -0,0 +1,462 @@
+# ============================================================
+# importer.py
+# ------------------------------------------------------------
+# Importação da planilha de imóveis (XLSX ou CSV) em lotes.
+#
+#   ler_xlsx / ler_csv  → registros {campo: valor bruto, linha}, gerados linha a
+#                         linha (XLSX em read-only, CSV decodificado aos
+#                         poucos) — a memória não cresce com o arquivo
+#   validar(registros)  → anota os problemas de cada linha (valor ilegível,
+#                         status desconhecido, código repetido / vazio)
+#   importar(registros) → para cada lote de IMPORT_BATCH_SIZE linhas:
+#       1 SELECT dos imóveis existentes pelos códigos do lote
+#       compara campo a campo (linha igual = "inalterada", não é escrita)
+#       1 INSERT ... ON DUPLICATE KEY UPDATE (MySQL) ou bulk insert +
+#         bulk update por id (outros bancos)
+#       commit
+#
+# Célula vazia mantém o valor atual do imóvel (em imóvel novo: vazio,
+# valor 0, status 'ativo').
+#
+# Exportação (/admin/export.xlsx, /admin/export): só as colunas da
+# planilha, lidas com yield_per (cursor no servidor) e escritas conforme
+# chegam — CSV em pedaços na resposta, XLSX num workbook write-only.
+# ============================================================
+
+import codecs
+import csv
+import io
+import math
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import config
+import listing
+from models import db, Imovel
+
+try:
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+except Exception:
+    openpyxl = None
+
+COLUNAS_OBRIGATORIAS = ["codigo", "tipo", "valor", "bairro", "descricao", "status"]
+COLUNAS_OPCIONAIS = ["finalidade", "imagem"]
+COLUNAS_EXPORT = ["codigo", "tipo", "valor", "bairro", "descricao", "status", "finalidade"]
+
+# linhas lidas do banco por vez na exportação
+EXPORT_YIELD_PER = 1000
+
+# bytes do começo do CSV usados para detectar encoding e delimitador
+CSV_SNIFF_BYTES = 64 * 1024
+
+# colunas gravadas pelo import (além de codigo)
+CAMPOS = ("tipo", "valor", "bairro", "descricao", "status", "finalidade", "imagem")
+
+
+class PlanilhaInvalida(ValueError):
+    """Cabeçalho sem as colunas obrigatórias (mensagem pronta para o admin)."""
+
+
+# ============================================================
+# HELPERS IMPORT/EXPORT (VALOR BRL + CSV DIALECT + STATUS)
+# ============================================================
+
+def _decimal_brl(raw):
+    """Decimal do valor em reais, ou None se não der para ler (vazio / texto)."""
+    if raw is None:
+        return None
+
+    s = str(raw).strip()
+    if not s:
+        return None
+
+    # remove moeda e espaços
+    s = s.replace("R$", "").replace("r$", "").strip()
+    s = s.replace("\u00a0", " ").replace(" ", "")
+
+    # remove qualquer coisa que não seja dígito, ponto, vírgula, sinal
+    s = re.sub(r"[^0-9\-,.]", "", s)
+
+    # se tem . e , -> padrão BR: 1.234.567,89
+    if "." in s and "," in s:
+        s = s.replace(".", "").replace(",", ".")
+    # se tem só vírgula -> vira decimal
+    elif "," in s and "." not in s:
+        s = s.replace(",", ".")
+    # se tem só ponto -> já é decimal US/Excel ou inteiro com ponto
+
+    try:
+        return Decimal(s)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def parse_valor_brl(raw) -> float:
+    """
+    Converte valores em formatos comuns (Excel/CSV) para float (reais):
+      - 1200000
+      - 1200000.00
+      - 1.200.000,00
+      - R$ 1.200.000,00
+      - "R$ 260.000,00"
+    O que não der para ler vira 0.
+    """
+    valor = _decimal_brl(raw)
+    return float(valor) if valor is not None else 0.0
+
+
+def sniff_csv_dialect(text: str) -> str:
+    """
+    Detecta delimitador (',' ou ';') usando heurística no header.
+    """
+    sample = "\n".join(text.splitlines()[:20])
+    header = sample.splitlines()[0] if sample.splitlines() else ""
+    delim = ";" if header.count(";") > header.count(",") else ","
+    return delim
+
+
+def normalize_status(raw, fallback="ativo") -> str:
+    """
+    Garante apenas 'ativo' ou 'inativo'.
+    Se vier qualquer outra coisa, usa fallback.
+    """
+    s = (str(raw).strip().lower() if raw is not None else "")
+    if s in ("ativo", "inativo"):
+        return s
+    return fallback or "ativo"
+
+
+def normalize_finalidade(raw, tipo=None, fallback="venda") -> str:
+    """
+    'venda' ou 'temporada'. Sem valor explícito, 'temporada' no tipo
+    (como era marcado antes da coluna existir) vale como temporada.
+    """
+    s = (str(raw).strip().lower() if raw is not None else "")
+    if s in listing.FINALIDADES:
+        return s
+    if "temporada" in (tipo or "").lower():
+        return "temporada"
+    return fallback or "venda"
+
+
+# ============================================================
+# LEITURA
+# ============================================================
+
+def _texto(v) -> str:
+    return str(v).strip() if v is not None else ""
+
+
+def _conferir_cabecalho(headers, nome):
+    missing = [h for h in COLUNAS_OBRIGATORIAS if h not in headers]
+    if missing:
+        raise PlanilhaInvalida(
+            f"{nome}. Faltando colunas: {', '.join(missing)}. "
+            f"Use o modelo oficial (/admin/modelo.xlsx)."
+        )
+
+
+def ler_xlsx(file):
+    """
+    Registros da aba ativa de um XLSX, linha a linha: o workbook é aberto
+    em modo read-only (as linhas são lidas do XML conforme o import
+    consome, sem montar a planilha em memória).
+    """
+    wb = openpyxl.load_workbook(getattr(file, "stream", file), read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        linhas = ws.iter_rows(values_only=True)
+
+        headers = [_texto(v).lower() for v in next(linhas, None) or ()]
+        _conferir_cabecalho(headers, "Planilha inválida")
+        idx = {h: headers.index(h) for h in COLUNAS_OBRIGATORIAS + COLUNAS_OPCIONAIS if h in headers}
+
+        for n, row in enumerate(linhas, 2):
+            # pula linha totalmente vazia
+            if not row or all(v is None or str(v).strip() == "" for v in row):
+                continue
+            reg = {campo: (row[i] if i < len(row) else None) for campo, i in idx.items()}
+            reg["linha"] = n
+            yield reg
+    finally:
+        wb.close()
+
+
+def _encoding(prefixo: bytes) -> str:
+    """UTF-8 (com/sem BOM) se o começo do arquivo decodifica, senão latin-1."""
+    try:
+        # final=False: um caractere cortado no fim do prefixo não conta como erro
+        codecs.getincrementaldecoder("utf-8-sig")().decode(prefixo, final=False)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def _registros_csv(raw, encoding, delim, depois_da_linha=0, inicio=0):
+    raw.seek(inicio)
+    text = io.TextIOWrapper(raw, encoding=encoding, newline="")
+    try:
+        reader = csv.DictReader(text, delimiter=delim)
+        reader.fieldnames = [h.strip().lower() for h in (reader.fieldnames or [])]
+        _conferir_cabecalho(reader.fieldnames, "CSV inválido")
+
+        for row in reader:
+            if reader.line_num <= depois_da_linha:
+                continue
+            reg = {k: row.get(k) for k in COLUNAS_OBRIGATORIAS + COLUNAS_OPCIONAIS if k in row}
+            reg["linha"] = reader.line_num
+            yield reg
+    finally:
+        # devolve o stream do upload sem fechá-lo (se ainda estiver aberto)
+        if not raw.closed:
+            text.detach()
+
+
+def ler_csv(file):
+    """
+    Registros de um CSV (',' ou ';', UTF-8 com/sem BOM ou latin-1), linha
+    a linha. Encoding e delimitador saem dos primeiros CSV_SNIFF_BYTES e
+    o resto é decodificado conforme é lido. Se um byte mais adiante não
+    for UTF-8, o arquivo é relido em latin-1 a partir da linha seguinte à
+    última entregue (nada é trocado por U+FFFD).
+    """
+    raw = getattr(file, "stream", file)
+    prefixo = raw.read(CSV_SNIFF_BYTES)
+
+    encoding = _encoding(prefixo)
+    delim = sniff_csv_dialect(prefixo.decode(encoding, errors="replace"))
+
+    ultima = 0
+    try:
+        for reg in _registros_csv(raw, encoding, delim):
+            ultima = reg["linha"]
+            yield reg
+    except UnicodeDecodeError:
+        if encoding == "latin-1":
+            raise
+        # BOM de UTF-8 no começo: em latin-1 viraria parte do cabeçalho
+        bom = len(codecs.BOM_UTF8) if prefixo.startswith(codecs.BOM_UTF8) else 0
+        yield from _registros_csv(raw, "latin-1", delim, ultima, bom)
+
+
+# ============================================================
+# ESCRITA EM LOTES
+# ============================================================
+
+def problemas(reg: dict) -> list:
+    """[(campo, mensagem)] da linha, sem olhar o resto da planilha."""
+    erros = []
+    if not _texto(reg.get("codigo")):
+        erros.append(("codigo", "linha sem código (ignorada)"))
+
+    valor = _texto(reg.get("valor"))
+    if valor and _decimal_brl(valor) is None:
+        erros.append(("valor", f"valor ilegível: {valor!r}"))
+
+    status = _texto(reg.get("status"))
+    if status and status.lower() not in ("ativo", "inativo"):
+        erros.append(("status", f"status desconhecido: {status!r} (use ativo ou inativo)"))
+    return erros
+
+
+def validar(registros, ao_erro):
+    """
+    Repassa os registros chamando ao_erro(linha, codigo, campo, mensagem)
+    para cada problema; inclui código repetido na planilha (a última linha
+    é a que vale no import).
+    """
+    vistos = {}   # código → primeira linha em que apareceu
+    for reg in registros:
+        codigo = _texto(reg.get("codigo"))
+        linha = reg.get("linha")
+        erros = problemas(reg)
+        if codigo:
+            if codigo in vistos:
+                erros.append(("codigo", f"código repetido (já aparece na linha {vistos[codigo]})"))
+            else:
+                vistos[codigo] = linha
+        for campo, msg in erros:
+            ao_erro(linha, codigo, campo, msg)
+        reg["ok"] = not erros
+        yield reg
+
+
+def _mesclar(atual: dict, reg: dict) -> dict:
+    """Valores finais do imóvel: o que veio na linha, ou o atual se a célula estiver vazia."""
+    atual = atual or {}
+    novo = {}
+    for campo in ("tipo", "bairro", "descricao"):
+        v = _texto(reg.get(campo))
+        novo[campo] = v or atual.get(campo) or ""
+
+    v = _texto(reg.get("valor"))
+    novo["valor"] = parse_valor_brl(v) if v else float(atual.get("valor") or 0.0)
+
+    novo["status"] = normalize_status(reg.get("status"), fallback=atual.get("status") or "ativo")
+    novo["finalidade"] = normalize_finalidade(
+        reg.get("finalidade"), tipo=novo["tipo"], fallback=atual.get("finalidade"),
+    )
+    novo["imagem"] = _texto(reg.get("imagem")) or atual.get("imagem")
+    return novo
+
+
+def _inalterado(novo: dict, atual: dict) -> bool:
+    """
+    Linha igual ao que está no banco? Texto vazio e NULL contam como iguais;
+    valor é FLOAT (precisão simples) no MySQL e volta arredondado, então
+    a comparação tolera o arredondamento da coluna (e os centavos).
+    """
+    for c in CAMPOS:
+        a, b = novo[c], atual[c]
+        if c == "valor":
+            if not math.isclose(float(a or 0), float(b or 0), rel_tol=1e-6, abs_tol=0.005):
+                return False
+        elif (a if a is not None else "") != (b if b is not None else ""):
+            return False
+    return True
+
+
+def _lotes(registros, tamanho):
+    lote = []
+    for reg in registros:
+        lote.append(reg)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _gravar(inserir: list, atualizar: list):
+    if not inserir and not atualizar:
+        return
+
+    if db.engine.dialect.name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(Imovel.__table__)
+        stmt = stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in CAMPOS + ("atualizado_em",)})
+        linhas = inserir + [{k: v for k, v in r.items() if k != "id"} for r in atualizar]
+        db.session.execute(stmt, linhas)
+        return
+
+    if inserir:
+        db.session.execute(db.insert(Imovel), inserir)
+    if atualizar:
+        db.session.execute(db.update(Imovel), atualizar)
+
+
+def importar(registros, batch: int = None, gravar: bool = True, ao_lote=None) -> dict:
+    """
+    Grava os registros em lotes. Retorna as contagens:
+    inseridos, atualizados, inalterados, ignorados (linha sem código).
+    gravar=False só calcula as contagens (simulação); ao_lote(res) é
+    chamado depois de cada lote (progresso / cancelamento).
+    """
+    batch = batch or config.IMPORT_BATCH_SIZE
+    res = {"inseridos": 0, "atualizados": 0, "inalterados": 0, "ignorados": 0}
+    colunas = [Imovel.id, Imovel.codigo] + [getattr(Imovel, c) for c in CAMPOS]
+
+    for lote in _lotes(registros, batch):
+        codigos = {_texto(r.get("codigo")) for r in lote} - {""}
+        existentes = {
+            r.codigo: r._asdict()
+            for r in db.session.query(*colunas).filter(Imovel.codigo.in_(codigos))
+        } if codigos else {}
+
+        novos, alterados = {}, {}
+        for reg in lote:
+            codigo = _texto(reg.get("codigo"))
+            if not codigo:
+                res["ignorados"] += 1
+                continue
+
+            # código repetido na planilha: a linha de baixo vale sobre a de cima
+            atual = novos.get(codigo) or alterados.get(codigo) or existentes.get(codigo)
+            novo = _mesclar(atual, reg)
+
+            if codigo in novos:
+                novos[codigo].update(novo)
+            elif codigo in existentes:
+                if _inalterado(novo, existentes[codigo]):
+                    alterados.pop(codigo, None)
+                    res["inalterados"] += 1
+                    continue
+                alterados[codigo] = dict(novo, id=existentes[codigo]["id"], codigo=codigo)
+            else:
+                novos[codigo] = dict(novo, codigo=codigo)
+
+        if gravar:
+            # carimbo do feed de mudanças explícito (o ON DUPLICATE KEY não aplica onupdate)
+            agora = datetime.utcnow()
+            for linha in (*novos.values(), *alterados.values()):
+                linha["atualizado_em"] = agora
+            _gravar(list(novos.values()), list(alterados.values()))
+            db.session.commit()
+        res["inseridos"] += len(novos)
+        res["atualizados"] += len(alterados)
+        if ao_lote:
+            ao_lote(res)
+
+    return res
+
+
+# ============================================================
+# EXPORTAÇÃO (STREAMING)
+# ============================================================
+
+def linhas_export():
+    """(codigo, tipo, valor, bairro, descricao, status, finalidade) por id, sem montar objetos."""
+    q = (
+        db.session.query(
+            Imovel.codigo, Imovel.tipo, Imovel.valor, Imovel.bairro,
+            Imovel.descricao, Imovel.status, Imovel.finalidade,
+        )
+        .order_by(Imovel.id)
+        .execution_options(yield_per=EXPORT_YIELD_PER)
+    )
+    for r in q:
+        yield (
+            r.codigo,
+            r.tipo,
+            float(r.valor or 0),
+            r.bairro,
+            r.descricao or "",
+            normalize_status(r.status, "ativo"),
+            r.finalidade,
+        )
+
+
+def csv_stream(linhas_por_pedaco: int = 500):
+    """Pedaços (bytes UTF-8) do CSV de exportação, para uma resposta em streaming."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(COLUNAS_EXPORT)
+
+    for n, (codigo, tipo, valor, bairro, descricao, status, finalidade) in enumerate(linhas_export(), 1):
+        # número puro no CSV (sem R$)
+        writer.writerow([codigo, tipo, valor, bairro, descricao.replace("\n", " "), status, finalidade])
+        if n % linhas_por_pedaco == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def salvar_xlsx(destino):
+    """
+    Escreve o XLSX de exportação em destino (arquivo ou file-like).
+    Workbook write-only: as linhas vão direto para o XML da aba.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("imoveis")
+    ws.append(COLUNAS_EXPORT)
+
+    for linha in linhas_export():
+        valor = WriteOnlyCell(ws, value=linha[2])
+        valor.number_format = 'R$ #,##0.00'
+        ws.append([linha[0], linha[1], valor, *linha[3:]])
+
+    wb.save(destino)
@@ -0,0 +1,227 @@
+# ============================================================
+# listing.py
+# ------------------------------------------------------------
+# Cards da listagem pública (home, /temporada, /api/imoveis, /api/busca).
+#
+# - Os cards vêm de imovel_cards (models.ImovelCard): linhas já prontas
+#   para o template — capa resolvida, resumo de 110 caracteres, valor em
+#   BRL e texto de busca. A listagem não junta fotos nem formata nada.
+# - Paginação keyset por id (mais novos primeiro): o cursor é o último
+#   id entregue, então a página N custa o mesmo que a página 1.
+# - /temporada usa a mesma consulta com finalidade='temporada'.
+#
+# atualizar_cards(ids) / reconstruir_cards() mantêm a tabela: chamados
+# pelas escritas do admin (app.catalogo_alterado), pelo import e quando
+# uma foto fica pronta (upload_pipeline).
+# ============================================================
+
+import logging
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Imovel, ImovelCard
+
+log = logging.getLogger(__name__)
+
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 60
+RESUMO_CHARS = 110
+
+PLACEHOLDER = "https://picsum.photos/800/600?blur=1"
+
+FINALIDADES = ("venda", "temporada")
+
+
+def brl(value) -> str:
+    """260000.5 → 'R$ 260.000,50' (também usado pelo filtro |brl)."""
+    try:
+        value = float(value)
+        return f"R$ {value:,.2f}".replace(",", "v").replace(".", ",").replace("v", ".")
+    except (ValueError, TypeError):
+        return "R$ 0,00"
+
+
+def parse_filtros(args) -> dict:
+    """Filtros vindos da querystring (finalidade, tipo, bairro, valor_min, valor_max)."""
+    def _float(name):
+        try:
+            return float(str(args.get(name)).replace(",", "."))
+        except (TypeError, ValueError):
+            return None
+
+    finalidade = (args.get("finalidade") or "").strip().lower()
+    return {
+        "finalidade": finalidade if finalidade in FINALIDADES else None,
+        "tipo": (args.get("tipo") or "").strip() or None,
+        "bairro": (args.get("bairro") or "").strip() or None,
+        "valor_min": _float("valor_min"),
+        "valor_max": _float("valor_max"),
+    }
+
+
+def parse_cursor(raw):
+    try:
+        return int(raw) if raw not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_limit(raw) -> int:
+    try:
+        n = int(raw)
+    except (TypeError, ValueError):
+        return PAGE_SIZE
+    return max(1, min(n, MAX_PAGE_SIZE))
+
+
+# ============================================================
+# LEITURA (imovel_cards)
+# ============================================================
+
+def _query(filtros: dict):
+    q = ImovelCard.query
+
+    if filtros.get("finalidade"):
+        q = q.filter(ImovelCard.finalidade == filtros["finalidade"])
+    # tipo/bairro por igualdade: a collation do MySQL já ignora maiúsculas
+    if filtros.get("tipo"):
+        q = q.filter(ImovelCard.tipo == filtros["tipo"])
+    if filtros.get("bairro"):
+        q = q.filter(ImovelCard.bairro == filtros["bairro"])
+    if filtros.get("valor_min") is not None:
+        q = q.filter(ImovelCard.valor >= filtros["valor_min"])
+    if filtros.get("valor_max") is not None:
+        q = q.filter(ImovelCard.valor <= filtros["valor_max"])
+    return q
+
+
+def card(row) -> dict:
+    """ImovelCard → dict pronto para o template / JSON."""
+    return {
+        "id": row.imovel_id,
+        "codigo": row.codigo,
+        "tipo": row.tipo,
+        "bairro": row.bairro,
+        "valor": row.valor,
+        "valor_brl": row.valor_brl,
+        "finalidade": row.finalidade,
+        "resumo": row.resumo,
+        "capa_url": row.capa_url,
+        "busca": row.busca,
+    }
+
+
+def page(filtros: dict, cursor=None, limit: int = PAGE_SIZE):
+    """
+    Retorna (cards, next_cursor). next_cursor é None na última página.
+    """
+    q = _query(filtros)
+    if cursor is not None:
+        q = q.filter(ImovelCard.imovel_id < cursor)
+
+    rows = q.order_by(ImovelCard.imovel_id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    cards = [card(r) for r in rows]
+    next_cursor = rows[-1].imovel_id if has_more and rows else None
+    return cards, next_cursor
+
+
+def cards_by_ids(ids, filtros: dict = None) -> list:
+    """Cards dos ids informados (ativos), na mesma ordem (ex.: ranking da busca)."""
+    if not ids:
+        return []
+    rows = _query(filtros or {}).filter(ImovelCard.imovel_id.in_(ids)).all()
+    by_id = {r.imovel_id: card(r) for r in rows}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+# ============================================================
+# ESCRITA (read model)
+# ============================================================
+
+def _fonte():
+    """Projeção dos imóveis ativos com o que o card precisa (capa no mesmo SELECT)."""
+    return db.session.query(
+        Imovel.id,
+        Imovel.codigo,
+        Imovel.tipo,
+        Imovel.bairro,
+        Imovel.valor,
+        Imovel.imagem,
+        Imovel.finalidade,
+        Imovel.capa_foto_id,
+        db.func.substr(Imovel.descricao, 1, RESUMO_CHARS + 1).label("descricao"),
+    ).filter(Imovel.status == "ativo")
+
+
+def _linha(row, agora) -> dict:
+    desc = row.descricao or ""
+    resumo = desc[:RESUMO_CHARS] + ("..." if len(desc) > RESUMO_CHARS else "")
+
+    if row.capa_foto_id:
+        capa = f"/foto/{row.capa_foto_id}/card"
+    else:
+        capa = row.imagem or PLACEHOLDER
+
+    valor = float(row.valor or 0)
+    return {
+        "imovel_id": row.id,
+        "codigo": row.codigo,
+        "tipo": row.tipo or "",
+        "bairro": row.bairro,
+        "finalidade": row.finalidade or "venda",
+        "valor": valor,
+        "valor_brl": brl(valor),
+        "resumo": resumo,
+        "capa_url": capa[:255],
+        "busca": f"{row.tipo} {row.bairro} {row.codigo} R$ {valor}".lower()[:255],
+        "atualizado_em": agora,
+    }
+
+
+def _refazer(ids):
+    agora = datetime.utcnow()
+    linhas = [_linha(r, agora) for r in _fonte().filter(Imovel.id.in_(ids))]
+    ImovelCard.query.filter(ImovelCard.imovel_id.in_(ids)).delete(synchronize_session=False)
+    if linhas:
+        db.session.execute(db.insert(ImovelCard), linhas)
+    return len(linhas)
+
+
+def atualizar_cards(ids):
+    """
+    Refaz os cards dos imóveis informados (inativos / removidos saem da
+    tabela). Usa a sessão atual e faz commit.
+    """
+    ids = sorted({int(i) for i in ids if i})
+    if not ids:
+        return
+
+    try:
+        _refazer(ids)
+        db.session.commit()
+    except IntegrityError:
+        # outro worker refez o mesmo card ao mesmo tempo: tenta de novo
+        db.session.rollback()
+        _refazer(ids)
+        db.session.commit()
+
+
+def reconstruir_cards(batch: int = 500, log=log.info) -> int:
+    """Refaz todos os cards (import / migração), em lotes. Retorna quantos."""
+    ids = [r[0] for r in db.session.query(Imovel.id).order_by(Imovel.id)]
+
+    ImovelCard.query.filter(ImovelCard.imovel_id.notin_(
+        db.select(Imovel.id).where(Imovel.status == "ativo")
+    )).delete(synchronize_session=False)
+
+    total = 0
+    for i in range(0, len(ids), batch):
+        total += _refazer(ids[i:i + batch])
+    db.session.commit()
+
+    log(f"🗂️  {total} cards da listagem refeitos")
+    return total
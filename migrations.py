@@ -0,0 +1,317 @@
+# ============================================================
+# migrations.py
+# ------------------------------------------------------------
+# Migrações de schema versionadas (MySQL em produção).
+#
+# db.create_all() só cria tabelas que ainda não existem; colunas
+# novas em tabelas antigas precisam passar por aqui. Cada passo é
+# idempotente (confere o schema antes de alterar), então rodar de
+# novo depois de uma falha no meio é seguro.
+#
+# Uso:  flask --app app db-upgrade
+#       flask --app app db-explain   (confere se as consultas quentes
+#                                     usam os índices esperados)
+# ============================================================
+
+import hashlib
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+
+from models import db, Imovel, ImovelCard, ImovelFoto, Servico
+
+MIGRATIONS = []
+
+
+def migration(version: int, descricao: str):
+    """Registra um passo de migração (executado em ordem de versão)."""
+    def deco(fn):
+        MIGRATIONS.append((version, descricao, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return deco
+
+
+# ============================================================
+# HELPERS DE SCHEMA
+# ============================================================
+
+def has_column(table: str, column: str) -> bool:
+    insp = inspect(db.engine)
+    return column in {c["name"] for c in insp.get_columns(table)}
+
+
+def add_column(table: str, ddl: str):
+    """ddl = definição completa, ex: 'sha256 VARCHAR(64) NULL'."""
+    column = ddl.split()[0]
+    if has_column(table, column):
+        return
+    with db.engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {ddl}"))
+
+
+def has_index(table: str, name: str) -> bool:
+    insp = inspect(db.engine)
+    return name in {i["name"] for i in insp.get_indexes(table)}
+
+
+def add_index(table: str, name: str, columns: list, prefix: str = ""):
+    """CREATE [FULLTEXT] INDEX, se ainda não existir."""
+    if has_index(table, name):
+        return
+    cols = ", ".join(columns)
+    with db.engine.begin() as conn:
+        conn.execute(text(f"CREATE {prefix + ' ' if prefix else ''}INDEX {name} ON {table} ({cols})"))
+
+
+def make_nullable(table: str, column: str):
+    """MySQL: MODIFY ... NULL mantendo o tipo atual. SQLite não precisa."""
+    if db.engine.dialect.name != "mysql":
+        return
+    insp = inspect(db.engine)
+    col = next(c for c in insp.get_columns(table) if c["name"] == column)
+    if col["nullable"]:
+        return
+    tipo = col["type"].compile(dialect=db.engine.dialect)
+    with db.engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table} MODIFY {column} {tipo} NULL"))
+
+
+def _ensure_version_table():
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            " version INTEGER PRIMARY KEY,"
+            " descricao VARCHAR(255),"
+            " aplicado_em DATETIME)"
+        ))
+
+
+def applied_versions() -> set:
+    _ensure_version_table()
+    with db.engine.connect() as conn:
+        rows = conn.execute(text("SELECT version FROM schema_migrations"))
+        return {r[0] for r in rows}
+
+
+def upgrade(log=print) -> int:
+    """
+    Cria tabelas novas e aplica as migrações pendentes.
+    Retorna quantos passos foram aplicados.
+    """
+    db.create_all()
+    done = applied_versions()
+    count = 0
+
+    for version, descricao, fn in MIGRATIONS:
+        if version in done:
+            continue
+        log(f"➡️  Migração {version}: {descricao}")
+        fn()
+        with db.engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, descricao, aplicado_em) "
+                     "VALUES (:v, :d, :t)"),
+                {"v": version, "d": descricao, "t": datetime.utcnow()},
+            )
+        count += 1
+
+    return count
+
+
+# ============================================================
+# PASSOS
+# ============================================================
+
+@migration(1, "imovel_fotos: sha256 + tamanho (ETag / cache HTTP)")
+def _m001_foto_hash():
+    add_column("imovel_fotos", "sha256 VARCHAR(64) NULL")
+    add_column("imovel_fotos", "tamanho INTEGER NULL")
+    backfill_foto_hashes()
+
+
+def backfill_foto_hashes(batch: int = 50):
+    """
+    Calcula sha256/tamanho das fotos antigas, um BLOB por vez
+    (nunca o catálogo inteiro em memória).
+    """
+    last_id = 0
+    while True:
+        ids = [
+            r[0] for r in db.session.query(ImovelFoto.id)
+            .filter(ImovelFoto.id > last_id, ImovelFoto.sha256.is_(None))
+            .order_by(ImovelFoto.id)
+            .limit(batch)
+        ]
+        if not ids:
+            break
+
+        for foto_id in ids:
+            conteudo = (
+                db.session.query(ImovelFoto.conteudo)
+                .filter_by(id=foto_id)
+                .scalar()
+            ) or b""
+            # SQL direto: o UPDATE do ORM incluiria colunas com onupdate
+            # (atualizado_em) que só existem depois de migrações futuras
+            db.session.execute(
+                text("UPDATE imovel_fotos SET sha256 = :s, tamanho = :t WHERE id = :id"),
+                {"s": hashlib.sha256(conteudo).hexdigest(), "t": len(conteudo), "id": foto_id},
+            )
+        db.session.commit()
+        last_id = ids[-1]
+
+
+@migration(2, "fotos/variantes: coluna armazenamento + conteudo opcional (backend fs)")
+def _m002_armazenamento():
+    for table in ("imovel_fotos", "imovel_foto_variantes"):
+        add_column(table, "armazenamento VARCHAR(10) NOT NULL DEFAULT 'blob'")
+        make_nullable(table, "conteudo")
+
+
+@migration(3, "imovel_fotos: status (processamento em background) + origem_sha256")
+def _m003_foto_status():
+    add_column("imovel_fotos", "status VARCHAR(20) NOT NULL DEFAULT 'pronta'")
+    add_column("imovel_fotos", "origem_sha256 VARCHAR(64) NULL")
+
+
+@migration(4, "índices das consultas quentes (status/valor/bairro/tipo, capa, serviços, FULLTEXT)")
+def _m004_indices():
+    add_index("imovel", "ix_imovel_status_id", ["status", "id"])
+    add_index("imovel", "ix_imovel_status_valor", ["status", "valor"])
+    add_index("imovel", "ix_imovel_status_bairro", ["status", "bairro"])
+    add_index("imovel", "ix_imovel_status_tipo", ["status", "tipo"])
+    add_index("imovel_fotos", "ix_foto_imovel_capa", ["imovel_id", "status", "is_capa", "id"])
+    add_index("servico", "ix_servico_data_solicitacao", ["data_solicitacao"])
+    if db.engine.dialect.name == "mysql":
+        add_index("imovel", "ft_imovel_descricao", ["descricao"], prefix="FULLTEXT")
+
+
+@migration(5, "imovel.finalidade (venda/temporada) + índice da listagem por finalidade")
+def _m005_finalidade():
+    add_column("imovel", "finalidade VARCHAR(20) NOT NULL DEFAULT 'venda'")
+    # antes a temporada era reconhecida por 'temporada' no tipo
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "UPDATE imovel SET finalidade = 'temporada' "
+            "WHERE LOWER(tipo) LIKE '%temporada%'"
+        ))
+    add_index("imovel", "ix_imovel_status_finalidade_id", ["status", "finalidade", "id"])
+
+
+@migration(6, "imovel_cards: cards da listagem pré-calculados")
+def _m006_imovel_cards():
+    import listing
+
+    # a tabela já foi criada pelo create_all(); aqui só é preenchida
+    listing.reconstruir_cards(log=print)
+
+
+@migration(7, "atualizado_em em imovel/fotos/lead/servico + tabela remocoes (feed de mudanças)")
+def _m007_atualizado_em():
+    tipo = "DATETIME(6)" if db.engine.dialect.name == "mysql" else "DATETIME"
+    # linhas antigas: a data que já existir, senão agora
+    origem = {
+        "imovel": None,
+        "imovel_fotos": "criado_em",
+        "lead": "data",
+        "servico": "data_solicitacao",
+    }
+    agora = datetime.utcnow()
+    for table, coluna in origem.items():
+        add_column(table, f"atualizado_em {tipo} NULL")
+        valor = f"COALESCE({coluna}, :agora)" if coluna else ":agora"
+        with db.engine.begin() as conn:
+            conn.execute(
+                text(f"UPDATE {table} SET atualizado_em = {valor} WHERE atualizado_em IS NULL"),
+                {"agora": agora},
+            )
+
+    add_index("imovel", "ix_imovel_atualizado", ["atualizado_em", "id"])
+    add_index("imovel_fotos", "ix_foto_atualizado", ["atualizado_em", "id"])
+    add_index("lead", "ix_lead_atualizado", ["atualizado_em", "id"])
+    add_index("servico", "ix_servico_atualizado", ["atualizado_em", "id"])
+    # a tabela remocoes já foi criada pelo create_all()
+
+
+# ============================================================
+# EXPLAIN DAS CONSULTAS QUENTES
+# ------------------------------------------------------------
+# Cada item: (nome, statement, tabela, índices aceitos). O check passa
+# se o plano usa um dos índices aceitos para aquela tabela.
+# ============================================================
+
+def hot_queries() -> list:
+    import listing
+
+    ativo = Imovel.status == "ativo"
+    qs = [
+        ("listagem pública (keyset)",
+         listing._query({}).filter(ImovelCard.imovel_id < 1000)
+         .order_by(ImovelCard.imovel_id.desc()).limit(25).statement,
+         "imovel_cards", {"PRIMARY"}),
+        ("listagem por bairro",
+         listing._query({"bairro": "Ingleses"}).order_by(ImovelCard.imovel_id.desc()).limit(25).statement,
+         "imovel_cards", {"ix_card_bairro_id"}),
+        ("listagem de temporada",
+         listing._query({"finalidade": "temporada"}).order_by(ImovelCard.imovel_id.desc()).limit(25).statement,
+         "imovel_cards", {"ix_card_finalidade_id"}),
+        ("cards: capa do imóvel (capa_foto_id)",
+         listing._fonte().filter(Imovel.id.in_([1, 2, 3])).statement,
+         "imovel_fotos", {"ix_foto_imovel_capa"}),
+        ("Brandinho: tipo",
+         db.select(Imovel.id).where(ativo, Imovel.tipo == "casa"),
+         "imovel", {"ix_imovel_status_tipo"}),
+        ("Brandinho: faixa de valor",
+         db.select(Imovel.id).where(ativo, Imovel.valor.between(300000, 600000)),
+         "imovel", {"ix_imovel_status_valor"}),
+        ("admin_servicos (ordem por data)",
+         db.select(Servico.id).order_by(Servico.data_solicitacao.desc()).limit(50),
+         "servico", {"ix_servico_data_solicitacao"}),
+    ]
+    if db.engine.dialect.name == "mysql":
+        qs.append((
+            "busca FULLTEXT na descrição",
+            db.select(Imovel.id).where(
+                text("MATCH (descricao) AGAINST ('piscina' IN NATURAL LANGUAGE MODE)")
+            ),
+            "imovel", {"ft_imovel_descricao"},
+        ))
+    return qs
+
+
+def _plan(sql: str) -> list:
+    """[(tabela, índice usado)] do plano, em MySQL ou SQLite."""
+    dialect = db.engine.dialect.name
+    with db.engine.connect() as conn:
+        if dialect == "mysql":
+            rows = conn.execute(text("EXPLAIN " + sql)).mappings().all()
+            return [(r["table"], r["key"]) for r in rows]
+
+        rows = conn.execute(text("EXPLAIN QUERY PLAN " + sql)).all()
+        out = []
+        for r in rows:
+            detail = r[-1]
+            parts = detail.split()
+            table = parts[1] if len(parts) > 1 and parts[0] in ("SEARCH", "SCAN") else None
+            key = None
+            if " INDEX " in detail:
+                key = detail.split(" INDEX ", 1)[1].split()[0]
+            elif "INTEGER PRIMARY KEY" in detail:
+                key = "PRIMARY"
+            out.append((table, key))
+        return out
+
+
+def explain_report(log=print) -> bool:
+    """Roda EXPLAIN em cada consulta quente; True se todas usam o índice esperado."""
+    ok_all = True
+    for nome, stmt, table, aceitos in hot_queries():
+        sql = str(stmt.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}))
+        plano = _plan(sql)
+        usados = {k for t, k in plano if k and (t is None or t.startswith(table) or t == "subquery")}
+        ok = bool(usados & aceitos)
+        ok_all &= ok
+        log(f"{'✅' if ok else '❌'} {nome}: {table} → {', '.join(sorted(usados)) or 'sem índice'}"
+            f" (esperado: {', '.join(sorted(aceitos))})")
+    return ok_all
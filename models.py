@@ -1,13 +1,29 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
 
 db = SQLAlchemy()
 
+# Carimbo de alteração (feed de mudanças, change_feed.py): microssegundos
+# no MySQL (DATETIME puro só guarda segundos)
+Carimbo = db.DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql")
+
 # ============================================================
 #  IMÓVEL
 # ============================================================
 class Imovel(db.Model):
     __tablename__ = 'imovel'
+    # Índices das consultas públicas (sempre status='ativo') e do Brandinho;
+    # migrations.py cria os mesmos em bancos já existentes
+    __table_args__ = (
+        db.Index('ix_imovel_status_id', 'status', 'id'),
+        db.Index('ix_imovel_status_valor', 'status', 'valor'),
+        db.Index('ix_imovel_status_bairro', 'status', 'bairro'),
+        db.Index('ix_imovel_status_tipo', 'status', 'tipo'),
+        db.Index('ix_imovel_status_finalidade_id', 'status', 'finalidade', 'id'),
+        db.Index('ft_imovel_descricao', 'descricao', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+        db.Index('ix_imovel_atualizado', 'atualizado_em', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     codigo = db.Column(db.String(50), unique=True, nullable=False)
@@ -21,14 +37,22 @@ class Imovel(db.Model):
 
     status = db.Column(db.String(20), default='ativo')
 
+    # 'venda' ou 'temporada' (página /temporada)
+    finalidade = db.Column(db.String(20), nullable=False, default='venda', server_default='venda')
+
+    # Última alteração (feed de mudanças / delta)
+    atualizado_em = db.Column(Carimbo, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relações
     leads = db.relationship('Lead', backref='imovel', lazy=True)
     servicos = db.relationship('Servico', backref='imovel', lazy=True)
 
+    # Fotos nunca trazem o BLOB junto (ver ImovelFoto.conteudo, deferred)
     fotos = db.relationship(
         'ImovelFoto',
         backref='imovel',
         lazy=True,
+        order_by='ImovelFoto.id',
         cascade='all, delete-orphan'
     )
 
@@ -43,12 +67,18 @@ class Imovel(db.Model):
         - Se houver fotos mas nenhuma capa marcada → primeira foto
         - Se existir 'imagem' legado (antigo) → usa ela
         - Caso contrário → placeholder
+
+        O id da capa vem de `capa_foto_id` (subquery no mesmo SELECT do
+        imóvel), então a listagem não carrega a relação `fotos`.
         """
-        if self.fotos:
-            capa = next((f for f in self.fotos if f.is_capa), None)
-            if capa:
-                return f"/foto/{capa.id}"
-            return f"/foto/{self.fotos[0].id}"
+        return self.capa_url_for(None)
+
+    def capa_url_for(self, variante):
+        """Mesma regra de capa_url, pedindo uma variante (thumb, card, detalhe)."""
+        if self.capa_foto_id:
+            if variante:
+                return f"/foto/{self.capa_foto_id}/{variante}"
+            return f"/foto/{self.capa_foto_id}"
 
         if self.imagem:
             return self.imagem
@@ -64,6 +94,9 @@ class Imovel(db.Model):
 # ============================================================
 class Lead(db.Model):
     __tablename__ = 'lead'
+    __table_args__ = (
+        db.Index('ix_lead_atualizado', 'atualizado_em', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
@@ -71,6 +104,7 @@ class Lead(db.Model):
     mensagem = db.Column(db.Text)
     imovel_id = db.Column(db.Integer, db.ForeignKey('imovel.id'), nullable=True)
     data = db.Column(db.DateTime, default=datetime.utcnow)
+    atualizado_em = db.Column(Carimbo, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def __repr__(self):
         return f"<Lead {self.nome} - {self.telefone}>"
@@ -81,6 +115,10 @@ class Lead(db.Model):
 # ============================================================
 class Servico(db.Model):
     __tablename__ = 'servico'
+    __table_args__ = (
+        db.Index('ix_servico_data_solicitacao', 'data_solicitacao'),
+        db.Index('ix_servico_atualizado', 'atualizado_em', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nome_cliente = db.Column(db.String(100), nullable=False)
@@ -100,6 +138,8 @@ class Servico(db.Model):
         default='pendente'
     )
 
+    atualizado_em = db.Column(Carimbo, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     def __repr__(self):
         return f"<Servico {self.tipo_servico or ''} - {self.nome_cliente}>"
 
@@ -109,20 +149,164 @@ class Servico(db.Model):
 # ============================================================
 class ImovelFoto(db.Model):
     __tablename__ = 'imovel_fotos'
+    # capa_foto_id: WHERE imovel_id=? AND status='pronta' ORDER BY is_capa DESC, id
+    __table_args__ = (
+        db.Index('ix_foto_imovel_capa', 'imovel_id', 'status', 'is_capa', 'id'),
+        db.Index('ix_foto_atualizado', 'atualizado_em', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     imovel_id = db.Column(db.Integer, db.ForeignKey('imovel.id'), nullable=False)
 
-    # Conteúdo da imagem
-    conteudo = db.Column(db.LargeBinary, nullable=False)
+    # Conteúdo da imagem — deferred: só é lido do banco quando acessado
+    # (ou com undefer), nunca nas listagens. Vazio quando armazenamento='fs'.
+    conteudo = db.deferred(db.Column(db.LargeBinary, nullable=True))
+
+    # Onde estão os bytes: 'blob' (coluna acima) ou 'fs' (photo_storage)
+    armazenamento = db.Column(db.String(10), nullable=False, default='blob', server_default='blob')
 
     # Tipo MIME (image/jpeg, image/png...)
     mimetype = db.Column(db.String(100), nullable=False, default="image/jpeg")
 
+    # Hash do conteúdo (ETag) e tamanho em bytes — permitem responder
+    # 304 / HEAD sem ler o BLOB
+    sha256 = db.Column(db.String(64))
+    tamanho = db.Column(db.Integer)
+
     # Indicador de capa
     is_capa = db.Column(db.Boolean, default=False)
 
+    # 'processando' (no pool de imagens) → 'pronta' | 'erro'.
+    # Só fotos prontas aparecem nas páginas públicas.
+    status = db.Column(db.String(20), nullable=False, default='pronta', server_default='pronta')
+
+    # sha256 do arquivo como foi enviado (o conteúdo final é reprocessado);
+    # usado para não guardar o mesmo upload duas vezes
+    origem_sha256 = db.Column(db.String(64))
+
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+    atualizado_em = db.Column(Carimbo, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Derivadas (thumb / card / detalhe, JPEG + WebP)
+    variantes = db.relationship(
+        'ImovelFotoVariante',
+        backref='foto',
+        lazy=True,
+        cascade='all, delete-orphan'
+    )
 
     def __repr__(self):
         return f"<ImovelFoto {self.id} -> Imovel {self.imovel_id}>"
+
+
+# ============================================================
+#  VARIANTES DA FOTO (redimensionadas no upload)
+# ============================================================
+class ImovelFotoVariante(db.Model):
+    __tablename__ = 'imovel_foto_variantes'
+    __table_args__ = (
+        db.UniqueConstraint('foto_id', 'variante', 'formato', name='uq_foto_variante_formato'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    foto_id = db.Column(
+        db.Integer,
+        db.ForeignKey('imovel_fotos.id', ondelete='CASCADE'),
+        nullable=False
+    )
+
+    # 'thumb', 'card', 'detalhe' / 'jpeg', 'webp'
+    variante = db.Column(db.String(20), nullable=False)
+    formato = db.Column(db.String(10), nullable=False)
+
+    conteudo = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    armazenamento = db.Column(db.String(10), nullable=False, default='blob', server_default='blob')
+    mimetype = db.Column(db.String(100), nullable=False)
+    largura = db.Column(db.Integer)
+    altura = db.Column(db.Integer)
+    sha256 = db.Column(db.String(64))
+    tamanho = db.Column(db.Integer)
+
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ImovelFotoVariante {self.foto_id}/{self.variante}.{self.formato}>"
+
+
+# ============================================================
+#  REMOÇÕES (tombstones do feed de mudanças)
+# ------------------------------------------------------------
+#  Uma linha por imóvel / foto / lead / serviço apagado, gravada na
+#  mesma transação do DELETE (change_feed.py). O delta devolve estas
+#  linhas como "removido" para quem sincroniza.
+# ============================================================
+class Remocao(db.Model):
+    __tablename__ = 'remocoes'
+    __table_args__ = (
+        db.Index('ix_remocao_entidade_em', 'entidade', 'removido_em', 'registro_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    entidade = db.Column(db.String(20), nullable=False)   # 'imoveis', 'fotos', 'leads', 'servicos'
+    registro_id = db.Column(db.Integer, nullable=False)
+    codigo = db.Column(db.String(50))                    # imóveis: o código apagado
+    removido_em = db.Column(Carimbo, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<Remocao {self.entidade}/{self.registro_id}>"
+
+
+# ============================================================
+#  CARD DA LISTAGEM (read model)
+# ------------------------------------------------------------
+#  Uma linha por imóvel ativo, já pronta para o template / JSON:
+#  capa resolvida, resumo cortado, valor formatado e texto de busca.
+#  Mantida por listing.atualizar_cards() nas escritas do admin, no
+#  import e quando uma foto fica pronta.
+# ============================================================
+class ImovelCard(db.Model):
+    __tablename__ = 'imovel_cards'
+    __table_args__ = (
+        db.Index('ix_card_finalidade_id', 'finalidade', 'imovel_id'),
+        db.Index('ix_card_bairro_id', 'bairro', 'imovel_id'),
+        db.Index('ix_card_tipo_id', 'tipo', 'imovel_id'),
+        db.Index('ix_card_valor', 'valor'),
+    )
+
+    imovel_id = db.Column(
+        db.Integer,
+        db.ForeignKey('imovel.id', ondelete='CASCADE'),
+        primary_key=True,
+        autoincrement=False
+    )
+    codigo = db.Column(db.String(50), nullable=False)
+    tipo = db.Column(db.String(50), nullable=False)
+    bairro = db.Column(db.String(100))
+    finalidade = db.Column(db.String(20), nullable=False, default='venda')
+    valor = db.Column(db.Float, nullable=False)
+
+    valor_brl = db.Column(db.String(40), nullable=False)
+    resumo = db.Column(db.String(120), nullable=False, default='')
+    capa_url = db.Column(db.String(255), nullable=False)
+    busca = db.Column(db.String(255), nullable=False, default='')
+
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ImovelCard {self.codigo}>"
+
+
+# ============================================================
+#  CAPA RESOLVIDA NO MESMO SELECT DO IMÓVEL
+# ------------------------------------------------------------
+#  Capa marcada primeiro; sem capa → primeira foto (menor id).
+#  Definida aqui porque depende das duas classes.
+# ============================================================
+Imovel.capa_foto_id = db.column_property(
+    db.select(ImovelFoto.id)
+    .where(ImovelFoto.imovel_id == Imovel.id, ImovelFoto.status == 'pronta')
+    .order_by(ImovelFoto.is_capa.desc(), ImovelFoto.id)
+    .limit(1)
+    .correlate_except(ImovelFoto)
+    .scalar_subquery()
+)
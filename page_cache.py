@@ -0,0 +1,192 @@
+# ============================================================
+# page_cache.py
+# ------------------------------------------------------------
+# Cache do HTML das páginas públicas (/, /temporada, /imovel/<id>) e
+# dos fragmentos de card, por worker.
+#
+# Tudo é guardado junto com a versão do catálogo (catalog_version) em
+# que foi renderizado. Quando o admin altera o catálogo (admin_save,
+# admin_import, set_capa, remove_foto, admin_delete, foto processada)
+# a versão avança e o próximo acesso descarta o que havia — entre duas
+# edições, a página sai da memória sem tocar o MySQL.
+#
+# Métricas por página: hits, misses e tempo de render (ms) dos misses.
+# ============================================================
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+from markupsafe import Markup
+
+import catalog_version
+import config
+
+
+class PageCache:
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.version = None
+
+        self._lock = threading.Lock()
+        self._items = OrderedDict()   # chave -> (corpo, mimetype, etag) | Markup
+        self._used = 0
+
+        self.stats = {}               # nome -> contadores (ver _stats)
+        self.fragments = {"hits": 0, "misses": 0}
+        self.evictions = 0
+        self.resets = 0
+
+    # ------------------------------------------------------------
+    # versão / armazenamento
+    # ------------------------------------------------------------
+
+    def _sync(self, versao):
+        """Descarta tudo se o catálogo mudou desde o último acesso (lock já tomado)."""
+        if self.version != versao:
+            if self.version is not None:
+                self.resets += 1
+            self._items.clear()
+            self._used = 0
+            self.version = versao
+
+    def _get(self, key, versao):
+        with self._lock:
+            self._sync(versao)
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def _put(self, key, versao, item, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if self.version != versao:
+                return  # renderizado com uma versão que já mudou
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._used -= _size(old)
+            self._items[key] = item
+            self._used += size
+            while self._used > self.max_bytes and self._items:
+                _, ev = self._items.popitem(last=False)
+                self._used -= _size(ev)
+                self.evictions += 1
+
+    def _stats(self, nome) -> dict:
+        return self.stats.setdefault(nome, {
+            "hits": 0, "misses": 0, "render_ms_total": 0.0, "render_ms_max": 0.0,
+        })
+
+    # ------------------------------------------------------------
+    # páginas
+    # ------------------------------------------------------------
+
+    def cached(self, nome):
+        """
+        Decorator de view GET pública. Chave = nome + path com querystring.
+        Só respostas 200 são guardadas; ETag permite 304 nas revalidações.
+        """
+        def deco(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.max_bytes or request.method != "GET":
+                    return view(*args, **kwargs)
+
+                versao = catalog_version.current()
+                key = ("page", nome, request.full_path)
+                item = self._get(key, versao)
+
+                if item is not None:
+                    with self._lock:
+                        self._stats(nome)["hits"] += 1
+                    corpo, mimetype, etag = item
+                    resp = Response(corpo, mimetype=mimetype)
+                else:
+                    t0 = time.perf_counter()
+                    resp = make_response(view(*args, **kwargs))
+                    ms = (time.perf_counter() - t0) * 1000
+                    with self._lock:
+                        st = self._stats(nome)
+                        st["misses"] += 1
+                        st["render_ms_total"] += ms
+                        st["render_ms_max"] = max(st["render_ms_max"], ms)
+
+                    if resp.status_code != 200 or resp.direct_passthrough:
+                        return resp
+                    corpo = resp.get_data()
+                    etag = f"c{versao}-{hashlib.md5(corpo).hexdigest()[:16]}"
+                    self._put(key, versao, (corpo, resp.mimetype, etag), len(corpo))
+
+                resp.set_etag(etag)
+                return resp.make_conditional(request)
+            return wrapper
+        return deco
+
+    # ------------------------------------------------------------
+    # fragmentos
+    # ------------------------------------------------------------
+
+    def fragment(self, key, render) -> Markup:
+        """HTML de um fragmento (ex.: card), renderizado por render() no miss."""
+        if not self.max_bytes:
+            return Markup(render())
+
+        versao = catalog_version.current()
+        key = ("frag",) + tuple(key)
+        html = self._get(key, versao)
+        if html is not None:
+            with self._lock:
+                self.fragments["hits"] += 1
+            return html
+
+        html = Markup(render())
+        with self._lock:
+            self.fragments["misses"] += 1
+        self._put(key, versao, html, len(html))
+        return html
+
+    # ------------------------------------------------------------
+    # métricas
+    # ------------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            paginas = {}
+            for nome, st in self.stats.items():
+                s = dict(st)
+                total = s["hits"] + s["misses"]
+                s["hit_ratio"] = round(s["hits"] / total, 4) if total else None
+                s["render_ms_avg"] = round(s["render_ms_total"] / s["misses"], 2) if s["misses"] else None
+                s["render_ms_total"] = round(s["render_ms_total"], 2)
+                s["render_ms_max"] = round(s["render_ms_max"], 2)
+                paginas[nome] = s
+
+            frag = dict(self.fragments)
+            total = frag["hits"] + frag["misses"]
+            frag["hit_ratio"] = round(frag["hits"] / total, 4) if total else None
+
+            return {
+                "versao": self.version,
+                "itens": len(self._items),
+                "bytes": self._used,
+                "budget": self.max_bytes,
+                "evictions": self.evictions,
+                "resets": self.resets,
+                "paginas": paginas,
+                "fragmentos": frag,
+            }
+
+
+def _size(item) -> int:
+    if isinstance(item, tuple):
+        return len(item[0])
+    return len(item)
+
+
+cache = PageCache(max_bytes=config.PAGE_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,181 @@
+# ============================================================
+# photo_cache.py
+# ------------------------------------------------------------
+# Cache dos bytes das fotos guardadas como BLOB (backend "blob"):
+#   1) LRU em memória por worker, limitado em bytes
+#   2) diretório local compartilhado entre os workers do gunicorn
+#      (arquivo servido com send_file → sendfile, sem cópia)
+#
+# A chave é o sha256 do conteúdo (fotos são imutáveis), então não existe
+# entrada "velha": invalidate() só libera espaço quando uma foto sai do
+# catálogo (remove_foto / admin_delete).
+# ============================================================
+
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import config
+
+
+class PhotoCache:
+
+    def __init__(self, mem_bytes: int, disk_dir: str, disk_bytes: int, max_item: int):
+        self.mem_bytes = mem_bytes
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.max_item = max_item
+
+        self._lock = threading.Lock()
+        self._mem = OrderedDict()
+        self._mem_used = 0
+        self._puts_since_trim = 0
+
+        self.stats = {
+            "mem_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "mem_evictions": 0,
+            "disk_evictions": 0,
+            "invalidations": 0,
+        }
+
+    # ------------------------------------------------------------
+    # leitura
+    # ------------------------------------------------------------
+
+    def get(self, sha256: str):
+        """Retorna ('mem', bytes), ('disk', caminho) ou (None, None)."""
+        if not sha256:
+            return None, None
+
+        with self._lock:
+            body = self._mem.get(sha256)
+            if body is not None:
+                self._mem.move_to_end(sha256)
+                self.stats["mem_hits"] += 1
+                return "mem", body
+
+        p = self._disk_path(sha256)
+        if self.disk_bytes and os.path.exists(p):
+            try:
+                os.utime(p)  # mtime = último uso (ordem de despejo do disco)
+            except OSError:
+                pass
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            return "disk", p
+
+        with self._lock:
+            self.stats["misses"] += 1
+        return None, None
+
+    # ------------------------------------------------------------
+    # escrita
+    # ------------------------------------------------------------
+
+    def put(self, sha256: str, body: bytes):
+        if not sha256 or not body:
+            return
+        self._put_mem(sha256, body)
+        self._put_disk(sha256, body)
+
+    def _put_mem(self, sha256, body):
+        if len(body) > self.max_item or len(body) > self.mem_bytes:
+            return
+        with self._lock:
+            if sha256 in self._mem:
+                self._mem.move_to_end(sha256)
+                return
+            self._mem[sha256] = body
+            self._mem_used += len(body)
+            while self._mem_used > self.mem_bytes and self._mem:
+                _, old = self._mem.popitem(last=False)
+                self._mem_used -= len(old)
+                self.stats["mem_evictions"] += 1
+
+    def _put_disk(self, sha256, body):
+        if not self.disk_bytes or len(body) > self.disk_bytes:
+            return
+        dest = self._disk_path(sha256)
+        if os.path.exists(dest):
+            return
+        try:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(body)
+            os.replace(tmp, dest)
+        except OSError:
+            return
+
+        with self._lock:
+            self._puts_since_trim += 1
+            trim = self._puts_since_trim >= 32
+            if trim:
+                self._puts_since_trim = 0
+        if trim:
+            self.trim_disk()
+
+    def trim_disk(self):
+        """Apaga os arquivos menos usados até caber em disk_bytes."""
+        files, total = [], 0
+        for root, _, names in os.walk(self.disk_dir):
+            for n in names:
+                p = os.path.join(root, n)
+                try:
+                    st = os.stat(p)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, p))
+                total += st.st_size
+
+        files.sort()
+        for _, size, p in files:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.unlink(p)
+                total -= size
+                with self._lock:
+                    self.stats["disk_evictions"] += 1
+            except OSError:
+                pass
+
+    # ------------------------------------------------------------
+    # invalidação / métricas
+    # ------------------------------------------------------------
+
+    def invalidate(self, hashes):
+        for sha in {h for h in hashes if h}:
+            with self._lock:
+                body = self._mem.pop(sha, None)
+                if body is not None:
+                    self._mem_used -= len(body)
+                self.stats["invalidations"] += 1
+            try:
+                os.unlink(self._disk_path(sha))
+            except OSError:
+                pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            s = dict(self.stats)
+            s["mem_items"] = len(self._mem)
+            s["mem_bytes"] = self._mem_used
+            s["mem_budget"] = self.mem_bytes
+        lookups = s["mem_hits"] + s["disk_hits"] + s["misses"]
+        s["hit_ratio"] = round((s["mem_hits"] + s["disk_hits"]) / lookups, 4) if lookups else None
+        return s
+
+    def _disk_path(self, sha256: str) -> str:
+        return os.path.join(self.disk_dir, sha256[:2], sha256)
+
+
+cache = PhotoCache(
+    mem_bytes=config.PHOTO_CACHE_MEM_MB * 1024 * 1024,
+    disk_dir=config.PHOTO_CACHE_DIR,
+    disk_bytes=config.PHOTO_CACHE_DISK_MB * 1024 * 1024,
+    max_item=config.PHOTO_CACHE_MAX_ITEM_MB * 1024 * 1024,
+)
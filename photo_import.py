@@ -0,0 +1,237 @@
+# ============================================================
+# photo_import.py
+# ------------------------------------------------------------
+# Import de fotos em lote: um ZIP com as imagens nomeadas pelo código
+# do imóvel, enviado em /admin/import (roda como job, import_jobs.py).
+#
+#   A001_capa.jpg  → foto do A001, vira a capa
+#   A001_1.jpg     → fotos do A001, na ordem do número
+#   A001.jpg       → foto do A001
+#   (pastas dentro do ZIP são ignoradas; só o nome do arquivo conta)
+# O nome inteiro (sem extensão) é procurado primeiro entre os códigos:
+# APT-101.jpg é foto do APT-101, não a foto 101 do APT.
+#
+# Cada entrada é lida do ZIP em streaming (zf.open → spool_upload, com o
+# mesmo limite de UPLOAD_MAX_FILE_MB por foto), gravada como
+# ImovelFoto('processando') e, a cada IMPORT_FOTOS_BATCH fotos, o lote
+# é commitado e enviado ao pool de imagens do upload_pipeline — decode,
+# EXIF e variantes rodam em paralelo nos processos do pool.
+# Fotos já existentes no imóvel (mesmo sha256) são puladas.
+# ============================================================
+
+import logging
+import os
+import re
+import zipfile
+
+import catalog_version
+import config
+import image_pipeline
+import listing
+import photo_storage
+import upload_pipeline
+from models import db, Imovel, ImovelFoto
+
+log = logging.getLogger(__name__)
+
+_NOME = re.compile(r"^(?P<base>.+)\.(?:jpe?g|png|gif)$", re.IGNORECASE)
+_SUFIXO = re.compile(r"^(?P<codigo>.+)[_-](?P<sufixo>capa|\d+)$", re.IGNORECASE)
+
+
+class ZipInvalido(ValueError):
+    """Arquivo enviado como .zip que não é um ZIP (mensagem pronta para o admin)."""
+
+
+def conferir(fh):
+    if not zipfile.is_zipfile(fh):
+        raise ZipInvalido("ZIP inválido. Envie um .zip com as fotos nomeadas pelo código (ex.: A001_1.jpg).")
+    fh.seek(0)
+
+
+def _entradas(zf):
+    """
+    ([(info, codigo, capa)], {código: id}) das imagens do ZIP, na ordem
+    de gravação: por código, capa primeiro, depois pelo número do nome.
+    Só lê o diretório do ZIP (nada é descompactado aqui). Entradas fora
+    do padrão saem com codigo None.
+    """
+    nomes = []
+    for info in zf.infolist():
+        nome = os.path.basename(info.filename)
+        if info.is_dir() or not nome or nome.startswith(".") or info.filename.startswith("__MACOSX/"):
+            continue
+        m = _NOME.match(nome)
+        base = m.group("base") if m else None
+        nomes.append((info, nome, base, _SUFIXO.match(base) if base else None))
+
+    candidatos = {base for _, _, base, _ in nomes if base}
+    candidatos |= {s.group("codigo") for _, _, _, s in nomes if s}
+    ids = _imoveis(candidatos)
+
+    itens = []
+    for info, nome, base, s in nomes:
+        if base is None:
+            itens.append((("", 0, 0, nome), info, None, False))
+            continue
+        if base in ids or s is None:
+            codigo, sufixo = base, ""
+        else:
+            codigo, sufixo = s.group("codigo"), s.group("sufixo").lower()
+        capa = sufixo == "capa"
+        ordem = int(sufixo) if sufixo.isdigit() else 0
+        itens.append(((codigo, 0 if capa else 1, ordem, nome), info, codigo, capa))
+
+    itens.sort(key=lambda x: x[0])
+    return [(info, codigo, capa) for _, info, codigo, capa in itens], ids
+
+
+def _imoveis(codigos) -> dict:
+    """código → id, em consultas de até 500 códigos."""
+    codigos = sorted(codigos)
+    ids = {}
+    for i in range(0, len(codigos), 500):
+        ids.update(
+            db.session.query(Imovel.codigo, Imovel.id)
+            .filter(Imovel.codigo.in_(codigos[i:i + 500]))
+        )
+    return ids
+
+
+def _estado_fotos(imovel_ids):
+    """(hashes por imóvel, imóveis que já têm capa)."""
+    hashes, com_capa = {}, set()
+    ids = sorted(imovel_ids)
+    for i in range(0, len(ids), 500):
+        q = db.session.query(
+            ImovelFoto.imovel_id,
+            db.func.coalesce(ImovelFoto.origem_sha256, ImovelFoto.sha256),
+            ImovelFoto.is_capa,
+        ).filter(ImovelFoto.imovel_id.in_(ids[i:i + 500]))
+        for imovel_id, sha, is_capa in q:
+            hashes.setdefault(imovel_id, set()).add(sha)
+            if is_capa:
+                com_capa.add(imovel_id)
+    return hashes, com_capa
+
+
+def _trocar_capa(imovel_id, foto):
+    """A foto nova (já com id) passa a ser a única capa do imóvel."""
+    ImovelFoto.query.filter(
+        ImovelFoto.imovel_id == imovel_id, ImovelFoto.id != foto.id,
+    ).update({"is_capa": False}, synchronize_session=False)
+    # compat com coluna antiga (como em set_capa)
+    Imovel.query.filter_by(id=imovel_id).update({"imagem": f"/foto/{foto.id}"}, synchronize_session=False)
+
+
+def importar_zip(fh, gravar: bool = True, ao_erro=None, ao_lido=None, ao_lote=None) -> dict:
+    """
+    Anexa as fotos do ZIP aos imóveis. Retorna as contagens:
+    inseridos (fotos novas), inalterados (já existiam), ignorados, capas.
+    ao_erro(linha, codigo, campo, mensagem) para cada entrada recusada
+    (linha = nome da entrada); ao_lido(ok) por entrada; ao_lote(res)
+    depois de cada commit. gravar=False só confere nomes, códigos e tipos.
+    """
+    ao_erro = ao_erro or (lambda *a: None)
+    res = {"inseridos": 0, "inalterados": 0, "ignorados": 0, "capas": 0}
+    max_bytes = config.UPLOAD_MAX_FILE_MB * 1024 * 1024
+    batch = config.IMPORT_FOTOS_BATCH
+
+    with zipfile.ZipFile(fh) as zf:
+        entradas, ids = _entradas(zf)
+        hashes, com_capa = _estado_fotos(ids.values())
+
+        tocados = set()
+        pendentes = []   # (foto, caminho em staging) do lote atual
+        capas = []       # (imovel_id, foto) do lote com _capa no nome
+
+        def fechar_lote():
+            if gravar:
+                # nada vai ao banco antes do fim do lote: o atualizado_em
+                # (feed de mudanças) é carimbado junto do commit, não
+                # minutos antes, e não fica para trás de um cursor do delta
+                db.session.flush()
+                for imovel_id, foto in capas:
+                    _trocar_capa(imovel_id, foto)
+                db.session.commit()
+                for foto, caminho in pendentes:
+                    upload_pipeline.enfileirar(foto.id, caminho)
+            pendentes.clear()
+            capas.clear()
+            if ao_lote:
+                ao_lote(res)
+
+        def recusar(info, codigo, campo, msg):
+            res["ignorados"] += 1
+            ao_erro(info.filename, codigo or "", campo, msg)
+            if ao_lido:
+                ao_lido(False)
+
+        try:
+            for info, codigo, capa in entradas:
+                if codigo is None:
+                    recusar(info, None, "arquivo", "nome fora do padrão CODIGO_N.jpg / CODIGO_capa.jpg")
+                    continue
+                imovel_id = ids.get(codigo)
+                if imovel_id is None:
+                    recusar(info, codigo, "codigo", f"imóvel {codigo} não cadastrado")
+                    continue
+
+                with zf.open(info) as entrada:
+                    try:
+                        sha, tamanho, tmp = photo_storage.spool_upload(entrada, max_bytes)
+                    except photo_storage.UploadTooLarge as e:
+                        recusar(info, codigo, "arquivo", str(e))
+                        continue
+
+                with tmp:
+                    # tipo real pelos magic bytes (a extensão pode mentir)
+                    mimetype = image_pipeline.detectar_mimetype(tmp.read(16))
+                    if not tamanho or not mimetype:
+                        recusar(info, codigo, "arquivo", "não é JPEG/PNG/GIF")
+                        continue
+
+                    if ao_lido:
+                        ao_lido(True)
+                    if sha in hashes.setdefault(imovel_id, set()):
+                        res["inalterados"] += 1
+                        continue
+                    hashes[imovel_id].add(sha)
+
+                    nova_capa = capa or imovel_id not in com_capa
+                    res["inseridos"] += 1
+                    res["capas"] += int(nova_capa)
+                    com_capa.add(imovel_id)
+                    if not gravar:
+                        continue
+
+                    foto = ImovelFoto(
+                        imovel_id=imovel_id,
+                        mimetype=mimetype,
+                        is_capa=nova_capa,
+                        status="processando",
+                        origem_sha256=sha,
+                    )
+                    photo_storage.store_file(foto, sha, tamanho, tmp)
+                    db.session.add(foto)
+                    if capa:
+                        capas.append((imovel_id, foto))
+                    pendentes.append((foto, upload_pipeline.stage(tmp)))
+                    tocados.add(imovel_id)
+
+                if len(pendentes) >= batch:
+                    fechar_lote()
+            fechar_lote()
+        finally:
+            for _, caminho in pendentes:
+                try:
+                    os.unlink(caminho)
+                except OSError:
+                    pass
+            if tocados:
+                db.session.rollback()
+                # capas trocadas em fotos já prontas: os cards mudam agora
+                # (as fotos novas refazem o card quando ficam prontas)
+                listing.atualizar_cards(tocados)
+                catalog_version.bump()
+
+    return res
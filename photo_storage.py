@@ -0,0 +1,248 @@
+# ============================================================
+# photo_storage.py
+# ------------------------------------------------------------
+# Onde ficam os bytes das fotos (originais e variantes):
+#   - "blob": coluna `conteudo` no MySQL (legado / compatibilidade)
+#   - "fs":   diretório endereçado por conteúdo, caminho derivado do
+#             sha256 (ab/cd/abcd...). Servido com send_file num caminho
+#             real, então o gunicorn usa sendfile e o BLOB não passa
+#             pelo driver MySQL nem pelo pool.
+#
+# Cada linha grava em `armazenamento` onde está o seu conteúdo, então
+# os dois backends convivem durante a migração (fotos-migrar).
+# ============================================================
+
+import hashlib
+import os
+import shutil
+import tempfile
+
+from sqlalchemy import func
+
+import config
+from models import db, ImovelFoto, ImovelFotoVariante
+
+CHUNK = 64 * 1024
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class BlobStorage:
+    """Bytes na própria linha (coluna conteudo)."""
+
+    nome = "blob"
+
+    def put(self, obj, conteudo):
+        obj.conteudo = conteudo if isinstance(conteudo, bytes) else conteudo.read()
+
+    def path(self, obj):
+        return None
+
+    def get(self, obj):
+        return (
+            db.session.query(type(obj).conteudo)
+            .filter_by(id=obj.id)
+            .scalar()
+        )
+
+
+class FilesystemStorage:
+    """Diretório endereçado por sha256, com subpastas de 2 níveis."""
+
+    nome = "fs"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], sha256[2:4], sha256)
+
+    def write(self, sha256: str, conteudo) -> str:
+        """
+        Grava de forma atômica (tmp + rename). Conteúdo igual = mesmo arquivo.
+        `conteudo` pode ser bytes ou um arquivo aberto (copiado em blocos).
+        """
+        dest = self._path(sha256)
+        if os.path.exists(dest):
+            return dest
+
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(dest), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                if isinstance(conteudo, bytes):
+                    fh.write(conteudo)
+                else:
+                    shutil.copyfileobj(conteudo, fh, CHUNK)
+                fh.flush()
+                os.fsync(fh.fileno())
+            os.replace(tmp, dest)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return dest
+
+    def put(self, obj, conteudo):
+        self.write(obj.sha256, conteudo)
+        obj.conteudo = None
+
+    def path(self, obj):
+        p = self._path(obj.sha256)
+        return p if os.path.exists(p) else None
+
+    def get(self, obj):
+        p = self.path(obj)
+        if not p:
+            return None
+        with open(p, "rb") as fh:
+            return fh.read()
+
+    def delete(self, sha256: str):
+        try:
+            os.unlink(self._path(sha256))
+        except FileNotFoundError:
+            pass
+
+
+_blob = BlobStorage()
+_fs = FilesystemStorage(config.PHOTO_STORAGE_DIR)
+
+
+def backend(nome: str = None):
+    nome = nome or config.PHOTO_STORAGE
+    return _fs if nome == "fs" else _blob
+
+
+def store(obj, conteudo: bytes):
+    """
+    Preenche sha256/tamanho/armazenamento de uma ImovelFoto ou
+    ImovelFotoVariante e grava os bytes no backend configurado.
+    """
+    obj.sha256 = obj.sha256 or hashlib.sha256(conteudo).hexdigest()
+    obj.tamanho = len(conteudo)
+    b = backend()
+    obj.armazenamento = b.nome
+    b.put(obj, conteudo)
+
+
+def spool_upload(stream, max_bytes: int):
+    """
+    Lê um upload em blocos para um SpooledTemporaryFile (memória até
+    UPLOAD_SPOOL_KB, depois disco), calculando o sha256 no caminho.
+    Retorna (sha256, tamanho, arquivo posicionado no início).
+    """
+    h = hashlib.sha256()
+    total = 0
+    tmp = tempfile.SpooledTemporaryFile(max_size=config.UPLOAD_SPOOL_KB * 1024)
+    while True:
+        buf = stream.read(CHUNK)
+        if not buf:
+            break
+        total += len(buf)
+        if total > max_bytes:
+            tmp.close()
+            raise UploadTooLarge(f"arquivo acima de {max_bytes // (1024 * 1024)} MB")
+        h.update(buf)
+        tmp.write(buf)
+    tmp.seek(0)
+    return h.hexdigest(), total, tmp
+
+
+def store_file(obj, sha256: str, tamanho: int, fh):
+    """Como store(), mas a partir de um upload já em spool (spool_upload)."""
+    obj.sha256 = sha256
+    obj.tamanho = tamanho
+    b = backend()
+    obj.armazenamento = b.nome
+    fh.seek(0)
+    b.put(obj, fh)
+
+
+def path(obj):
+    """Caminho real no disco (só backend fs), ou None."""
+    return backend(obj.armazenamento).path(obj)
+
+
+def read(obj):
+    return backend(obj.armazenamento).get(obj)
+
+
+def hashes_for(imovel_id=None, foto_id=None) -> list:
+    """sha256 das fotos (e variantes) de um imóvel ou de uma foto — só metadados."""
+    fotos = db.session.query(ImovelFoto.id, ImovelFoto.sha256)
+    fotos = fotos.filter_by(id=foto_id) if foto_id else fotos.filter_by(imovel_id=imovel_id)
+    rows = fotos.all()
+    ids = [r[0] for r in rows]
+    hashes = [r[1] for r in rows]
+    if ids:
+        hashes += [
+            r[0] for r in db.session.query(ImovelFotoVariante.sha256)
+            .filter(ImovelFotoVariante.foto_id.in_(ids))
+        ]
+    return hashes
+
+
+def release(hashes):
+    """
+    Depois de apagar fotos/variantes: remove do disco os arquivos cujo
+    sha256 não é mais referenciado por nenhuma linha (dedup-safe).
+    """
+    for sha in {h for h in hashes if h}:
+        usados = (
+            db.session.query(func.count(ImovelFoto.id))
+            .filter(ImovelFoto.sha256 == sha, ImovelFoto.armazenamento == "fs")
+            .scalar()
+            + db.session.query(func.count(ImovelFotoVariante.id))
+            .filter(ImovelFotoVariante.sha256 == sha, ImovelFotoVariante.armazenamento == "fs")
+            .scalar()
+        )
+        if not usados:
+            _fs.delete(sha)
+
+
+# ============================================================
+# MIGRAÇÃO BLOB → FS (retomável)
+# ============================================================
+
+def migrate_to_fs(batch: int = 20, log=print) -> int:
+    """
+    Move os bytes das linhas 'blob' para o diretório. Cada linha só
+    vira 'fs' depois do arquivo gravado e conferido, com commit por
+    lote — se cair no meio, basta rodar de novo.
+    """
+    movidas = 0
+    for model in (ImovelFoto, ImovelFotoVariante):
+        last_id = 0
+        while True:
+            ids = [
+                r[0] for r in db.session.query(model.id)
+                .filter(model.id > last_id, model.armazenamento == "blob")
+                .order_by(model.id)
+                .limit(batch)
+            ]
+            if not ids:
+                break
+
+            for obj_id in ids:
+                obj = model.query.get(obj_id)
+                conteudo = _blob.get(obj) or b""
+                sha = hashlib.sha256(conteudo).hexdigest()
+                if not conteudo or (obj.sha256 and obj.sha256 != sha):
+                    log(f"⚠️ {model.__tablename__} {obj_id}: conteúdo vazio ou hash divergente, pulando")
+                    continue
+
+                _fs.write(sha, conteudo)
+                obj.sha256, obj.tamanho = sha, len(conteudo)
+                obj.armazenamento = "fs"
+                obj.conteudo = None
+                movidas += 1
+
+            db.session.commit()
+            db.session.expunge_all()
+            last_id = ids[-1]
+            log(f"📦 {model.__tablename__}: até id {last_id}")
+
+    return movidas
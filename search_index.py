@@ -0,0 +1,173 @@
+# ============================================================
+# search_index.py
+# ------------------------------------------------------------
+# Índice invertido em memória para a busca do catálogo
+# (codigo, tipo, bairro, descricao), usado pela busca do admin e por
+# /api/busca.
+#
+# - acentos e maiúsculas ignorados ("Jurerê" = "jurere")
+# - prefixo: "cana" encontra "canasvieiras" (vale menos que o termo exato)
+# - ranking por campo: codigo > tipo/bairro > descricao
+# - todos os termos da busca precisam aparecer (AND)
+#
+# Montado no primeiro uso de cada worker, atualizado incrementalmente
+# pelas escritas do admin (admin_save / admin_import / admin_delete) e
+# remontado quando outro worker muda a versão do catálogo.
+# ============================================================
+
+import bisect
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+
+import catalog_version
+from models import db, Imovel
+
+PESOS = {"codigo": 5.0, "tipo": 3.0, "bairro": 3.0, "descricao": 1.0}
+PESO_PREFIXO = 0.5
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def fold(texto) -> str:
+    """Minúsculas e sem acentos."""
+    texto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokens(texto) -> list:
+    return _TOKEN.findall(fold(texto))
+
+
+class SearchIndex:
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)   # termo -> {id: peso}
+        self._vocab = []                     # termos ordenados (prefixo via bisect)
+        self._docs = {}                      # id -> (termos, status)
+        self.version = None
+
+    # ------------------------------------------------------------
+    # montagem / atualização
+    # ------------------------------------------------------------
+
+    def rebuild(self):
+        versao = catalog_version.current()
+        rows = (
+            db.session.query(
+                Imovel.id, Imovel.codigo, Imovel.tipo,
+                Imovel.bairro, Imovel.descricao, Imovel.status,
+            )
+            .execution_options(yield_per=500)
+        )
+        with self._lock:
+            self._postings = defaultdict(dict)
+            self._vocab = []
+            self._docs = {}
+            for r in rows:
+                self._add(r.id, r._asdict())
+            self._vocab = sorted(self._postings)
+            self.version = versao
+
+    def ensure_fresh(self):
+        """Remonta se o catálogo mudou em outro worker (ou nunca foi montado)."""
+        if self.version != catalog_version.current():
+            self.rebuild()
+
+    def upsert(self, imovel):
+        campos = {k: getattr(imovel, k) for k in ("codigo", "tipo", "bairro", "descricao", "status")}
+        with self._lock:
+            self._remove(imovel.id)
+            novos = self._add(imovel.id, campos)
+            for termo in novos:
+                i = bisect.bisect_left(self._vocab, termo)
+                if i == len(self._vocab) or self._vocab[i] != termo:
+                    self._vocab.insert(i, termo)
+
+    def remove(self, imovel_id):
+        with self._lock:
+            self._remove(imovel_id)
+
+    def mark_version(self, versao):
+        """
+        Versão gerada pela própria escrita (já aplicada incrementalmente).
+        Só avança se nenhuma outra escrita aconteceu no meio — senão o
+        próximo ensure_fresh() remonta.
+        """
+        with self._lock:
+            if self.version is not None and self.version == versao - 1:
+                self.version = versao
+
+    def _add(self, doc_id, campos) -> list:
+        pesos = defaultdict(float)
+        for campo, peso in PESOS.items():
+            for t in tokens(campos.get(campo)):
+                pesos[t] = max(pesos[t], peso)
+
+        novos = [t for t in pesos if t not in self._postings]
+        for t, p in pesos.items():
+            self._postings[t][doc_id] = p
+        self._docs[doc_id] = (set(pesos), campos.get("status"))
+        return novos
+
+    def _remove(self, doc_id):
+        doc = self._docs.pop(doc_id, None)
+        if not doc:
+            return
+        for t in doc[0]:
+            posting = self._postings.get(t)
+            if posting is None:
+                continue
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[t]
+                i = bisect.bisect_left(self._vocab, t)
+                if i < len(self._vocab) and self._vocab[i] == t:
+                    del self._vocab[i]
+
+    # ------------------------------------------------------------
+    # busca
+    # ------------------------------------------------------------
+
+    def _match(self, termo) -> dict:
+        """{id: score} para um termo da busca (exato + prefixo)."""
+        out = dict(self._postings.get(termo, {}))
+        i = bisect.bisect_left(self._vocab, termo)
+        while i < len(self._vocab) and self._vocab[i].startswith(termo):
+            t = self._vocab[i]
+            if t != termo:
+                for doc_id, p in self._postings[t].items():
+                    s = p * PESO_PREFIXO
+                    if s > out.get(doc_id, 0):
+                        out[doc_id] = s
+            i += 1
+        return out
+
+    def search(self, q, status=None, limit=None) -> list:
+        """Ids ordenados por relevância (desempate: mais novo primeiro)."""
+        self.ensure_fresh()
+        termos = list(dict.fromkeys(tokens(q)))
+        if not termos:
+            return []
+
+        with self._lock:
+            scores = None
+            for termo in termos:
+                m = self._match(termo)
+                if scores is None:
+                    scores = m
+                else:
+                    scores = {d: s + m[d] for d, s in scores.items() if d in m}
+                if not scores:
+                    return []
+
+            if status:
+                scores = {d: s for d, s in scores.items() if self._docs[d][1] == status}
+
+        ranked = sorted(scores, key=lambda d: (-scores[d], -d))
+        return ranked[:limit] if limit else ranked
+
+
+index = SearchIndex()
@@ -2,13 +2,124 @@
 /* Brando Imóveis / Nous - script.js */
 document.addEventListener('DOMContentLoaded', () => {
   const searchInput = document.querySelector('#search-input');
-  if (searchInput){
+  function applySearch(card){
+    const q = searchInput ? searchInput.value.toLowerCase() : '';
+    const text = card.getAttribute('data-search') || '';
+    card.style.display = text.includes(q) ? '' : 'none';
+  }
+  if (searchInput && !document.querySelector('#imoveis-grid')){
     searchInput.addEventListener('input', () => {
-      const q = searchInput.value.toLowerCase();
-      document.querySelectorAll('[data-card]').forEach(card => {
-        const text = card.getAttribute('data-search') || '';
-        card.style.display = text.includes(q) ? '' : 'none';
-      });
+      document.querySelectorAll('[data-card]').forEach(applySearch);
+    });
+  }
+
+  /* Listagem: próximas páginas via /api/imoveis (keyset) ao rolar */
+  const grid = document.querySelector('#imoveis-grid');
+  const more = document.querySelector('#imoveis-more');
+  const finalidade = grid ? grid.getAttribute('data-finalidade') : null;
+  function withParams(url, params){
+    const u = new URL(url, window.location.origin);
+    Object.entries(params).forEach(([k, v]) => { if (v) u.searchParams.set(k, v); });
+    return u.pathname + u.search;
+  }
+  function el(tag, cls, text){
+    const e = document.createElement(tag);
+    if (cls) e.className = cls;
+    if (text !== undefined) e.textContent = text;
+    return e;
+  }
+  function buildCard(i){
+    const card = el('div', 'card bg-white shadow-lg rounded-xl overflow-hidden hover:shadow-2xl transition transform hover:-translate-y-1');
+    card.setAttribute('data-card', '');
+    card.setAttribute('data-search', i.busca);
+    const temporada = i.finalidade === 'temporada' && finalidade === 'temporada';
+    const top = el('div', 'relative');
+    top.appendChild(temporada
+      ? el('span', 'badge bg-green-600 text-white absolute top-3 left-3 px-3 py-1 text-xs font-semibold rounded-full shadow', 'Temporada')
+      : el('span', 'badge bg-[color:var(--brand-blue)] text-white absolute top-3 left-3 px-3 py-1 text-xs font-semibold rounded-full shadow', i.tipo));
+    const img = el('img', 'w-full h-52 object-cover');
+    img.src = i.capa_url; img.loading = 'lazy'; img.alt = `Imagem do imóvel ${i.codigo}`;
+    top.appendChild(img);
+    const body = el('div', 'p-4');
+    body.appendChild(el('h3', 'text-xl font-semibold text-[color:var(--brand-blue)] mb-1', `${i.tipo} - ${i.bairro}`));
+    body.appendChild(el('p', 'text-gray-700 price mb-2 font-bold', (temporada ? 'Diária: ' : '') + i.valor_brl));
+    body.appendChild(el('p', 'text-sm text-gray-500 mb-3', i.resumo));
+    const actions = el('div', 'flex items-center justify-between');
+    const link = el('a', 'inline-block bg-[color:var(--brand-blue)] text-white px-4 py-2 rounded-md hover:bg-[color:var(--brand-blue-700)] transition', 'Ver detalhes');
+    link.href = `/imovel/${i.id}`;
+    const btn = el('button', 'text-sm underline text-[color:var(--brand-blue)]', 'Copiar msg WhatsApp');
+    btn.setAttribute('data-whats', temporada
+      ? `Olá! Tenho interesse em alugar o imóvel ${i.codigo} para temporada.`
+      : `Olá! Tenho interesse no imóvel código ${i.codigo}.`);
+    actions.appendChild(link); actions.appendChild(btn);
+    body.appendChild(actions);
+    card.appendChild(top); card.appendChild(body);
+    return card;
+  }
+  if (grid && more && 'IntersectionObserver' in window){
+    let loading = false;
+    const observer = new IntersectionObserver(async (entries) => {
+      if (!entries.some(e => e.isIntersecting) || loading) return;
+      const cursor = more.getAttribute('data-cursor');
+      if (!cursor) return;
+      loading = true;
+      try{
+        const r = await fetch(withParams(more.getAttribute('data-api'), { cursor }));
+        const data = await r.json();
+        (data.items || []).forEach(i => {
+          const card = buildCard(i);
+          grid.appendChild(card);
+          applySearch(card);
+        });
+        if (data.next_cursor){
+          more.setAttribute('data-cursor', data.next_cursor);
+        } else {
+          observer.disconnect();
+          more.remove();
+        }
+      }catch(e){
+        more.textContent = 'Não foi possível carregar mais imóveis.';
+      }finally{
+        loading = false;
+      }
+    }, { root: more.parentElement, rootMargin: '400px' });
+    observer.observe(more);
+  }
+
+  /* Busca da home / temporada: índice do servidor (/api/busca), sem acento e por prefixo */
+  if (searchInput && grid){
+    let timer = null;
+    let seq = 0;
+    function clearResults(){
+      grid.querySelectorAll('[data-busca]').forEach(c => c.remove());
+    }
+    searchInput.addEventListener('input', () => {
+      clearTimeout(timer);
+      const q = searchInput.value.trim();
+      timer = setTimeout(async () => {
+        const mine = ++seq;
+        if (!q){
+          clearResults();
+          grid.querySelectorAll('[data-card]').forEach(c => c.style.display = '');
+          if (more) more.style.display = '';
+          return;
+        }
+        try{
+          const r = await fetch(withParams('/api/busca', { q, finalidade }));
+          const data = await r.json();
+          if (mine !== seq) return;  // resposta de uma busca antiga
+          clearResults();
+          grid.querySelectorAll('[data-card]').forEach(c => c.style.display = 'none');
+          if (more) more.style.display = 'none';
+          (data.items || []).forEach(i => {
+            const card = buildCard(i);
+            card.setAttribute('data-busca', '');
+            grid.appendChild(card);
+          });
+        }catch(e){
+          grid.querySelectorAll('[data-card]').forEach(applySearch);
+        }
+      }, 250);
     });
   }
   const toggle = document.querySelector('#brandinho-toggle');
@@ -59,11 +170,12 @@ document.addEventListener('DOMContentLoaded', () => {
       if (e.key === 'Enter'){ sendBtn.click(); }
     });
   }
-  document.querySelectorAll('[data-whats]').forEach(btn => {
-    btn.addEventListener('click', () => {
-      const txt = btn.getAttribute('data-whats');
-      navigator.clipboard.writeText(txt).then(()=> toast('Mensagem copiada! Cole no WhatsApp.'));
-    });
+  // delegado: também vale para os cards carregados depois
+  document.addEventListener('click', (e) => {
+    const btn = e.target.closest('[data-whats]');
+    if (!btn) return;
+    const txt = btn.getAttribute('data-whats');
+    navigator.clipboard.writeText(txt).then(()=> toast('Mensagem copiada! Cole no WhatsApp.'));
   });
   const toastEl = document.querySelector('.toast');
   function toast(msg){
@@ -0,0 +1,79 @@
+# ============================================================
+# tests/conftest.py
+# ------------------------------------------------------------
+# O app roda contra um SQLite num diretório temporário (produção é
+# MySQL). Pastas de fotos, jobs e staging também vão para lá, e os
+# pools ficam desligados (IMAGE_WORKERS=0, IMPORT_WORKERS=0): fotos e
+# imports rodam na própria requisição.
+#
+#   python -m pytest -q
+# ============================================================
+
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+_TMP = tempfile.mkdtemp(prefix="brando-tests-")
+for _nome, _valor in {
+    "IMAGE_WORKERS": "0",
+    "IMPORT_WORKERS": "0",
+    "PHOTO_STORAGE_DIR": os.path.join(_TMP, "fotos"),
+    "PHOTO_CACHE_DIR": os.path.join(_TMP, "cache"),
+    "UPLOAD_STAGING_DIR": os.path.join(_TMP, "staging"),
+    "IMPORT_JOBS_DIR": os.path.join(_TMP, "jobs"),
+    "CATALOG_VERSION_FILE": os.path.join(_TMP, "catalogo.version"),
+}.items():
+    os.environ[_nome] = _valor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config  # noqa: E402
+
+config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+
+# connect_timeout é argumento do conector MySQL; o sqlite3 não aceita
+import flask_sqlalchemy  # noqa: E402
+
+_init_app = flask_sqlalchemy.SQLAlchemy.init_app
+
+
+def _init_app_sqlite(self, app):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"].pop("connect_args", None)
+    return _init_app(self, app)
+
+
+flask_sqlalchemy.SQLAlchemy.init_app = _init_app_sqlite
+
+import app as app_module  # noqa: E402
+from models import db  # noqa: E402
+
+flask_sqlalchemy.SQLAlchemy.init_app = _init_app
+
+
+@pytest.fixture
+def app():
+    flask_app = app_module.app
+    with flask_app.app_context():
+        db.create_all()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def admin(app):
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["admin_auth"] = True
+    return client
+
+
+def jpeg(w=64, h=48, cor=(200, 30, 30)) -> bytes:
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (w, h), cor).save(buf, "JPEG")
+    return buf.getvalue()
@@ -0,0 +1,19 @@
+from models import Imovel, db
+
+
+def test_filtros_de_tipo_e_bairro_no_painel(app, admin):
+    db.session.add_all([
+        Imovel(codigo="A1", tipo="casa", valor=1, bairro="Ratones", status="ativo"),
+        Imovel(codigo="B2", tipo="apartamento", valor=1, bairro="Ratones", status="ativo"),
+        Imovel(codigo="C3", tipo="casa", valor=1, bairro="Ingleses", status="ativo"),
+    ])
+    db.session.commit()
+
+    html = admin.get("/admin?tipo=casa&bairro=Ratones&sort=valor&dir=asc").get_data(as_text=True)
+
+    assert 'name="tipo" placeholder="Tipo" value="casa"' in html
+    assert 'name="bairro" placeholder="Bairro" value="Ratones"' in html
+    assert 'title="A1"' in html
+    assert 'title="B2"' not in html and 'title="C3"' not in html
+    # links de ordenação mantêm os filtros
+    assert 'href="?tipo=casa&amp;bairro=Ratones&amp;sort=codigo&amp;dir=desc"' in html
@@ -0,0 +1,10 @@
+import concurrency
+
+
+def test_so_o_post_de_lead_usa_as_vagas_de_lead(app):
+    rotas = {r.endpoint: r.methods for r in app.url_map.iter_rules()}
+    lead = [e for e, c in concurrency.ENDPOINTS.items() if c == "lead"]
+
+    assert lead == ["lead"]
+    assert rotas["lead"] - {"OPTIONS"} == {"POST"}
+    assert concurrency.classe("servicos") == "publico"
@@ -0,0 +1,61 @@
+import struct
+
+import importer
+from models import Imovel, db
+
+PLANILHA = [
+    {"codigo": "A001", "tipo": "casa", "valor": "1234,99", "bairro": "Jurerê",
+     "descricao": "Casa com piscina", "status": "ativo"},
+    {"codigo": "A002", "tipo": "apartamento", "valor": "R$ 1.234.567,89", "bairro": "",
+     "descricao": "", "status": "ativo"},
+    {"codigo": "A003", "tipo": "terreno", "valor": "350000", "bairro": "Ratones",
+     "descricao": None, "status": "inativo"},
+]
+
+
+def _planilha():
+    return [dict(r) for r in PLANILHA]
+
+
+def _carimbos():
+    return dict(db.session.query(Imovel.codigo, Imovel.atualizado_em))
+
+
+def test_reimportar_planilha_igual_nao_altera_nada(app):
+    assert importer.importar(_planilha())["inseridos"] == len(PLANILHA)
+    # linhas antigas, de antes do import, têm NULL onde a planilha tem vazio
+    Imovel.query.filter_by(codigo="A002").update({"bairro": None, "descricao": None})
+    db.session.commit()
+    antes = _carimbos()
+
+    res = importer.importar(_planilha())
+
+    assert res["inalterados"] == len(PLANILHA)
+    assert res["atualizados"] == 0
+    assert _carimbos() == antes
+
+
+def test_valor_arredondado_pela_coluna_float_conta_como_igual(app):
+    importer.importar(_planilha())
+    # MySQL: valor é FLOAT de precisão simples
+    for imovel in Imovel.query:
+        imovel.valor = struct.unpack("f", struct.pack("f", imovel.valor))[0]
+    db.session.commit()
+    antes = _carimbos()
+
+    res = importer.importar(_planilha())
+
+    assert res["inalterados"] == len(PLANILHA)
+    assert _carimbos() == antes
+
+
+def test_valor_diferente_atualiza(app):
+    importer.importar(_planilha())
+    planilha = _planilha()
+    planilha[0]["valor"] = "1235,99"
+
+    res = importer.importar(planilha)
+
+    assert res["atualizados"] == 1
+    assert res["inalterados"] == len(PLANILHA) - 1
+    assert Imovel.query.filter_by(codigo="A001").one().valor == 1235.99
@@ -0,0 +1,68 @@
+import io
+import os
+import zipfile
+
+import config
+import importer
+from conftest import jpeg
+from models import ImovelFoto
+
+MB = 1024 * 1024
+
+
+def _zip_maior_que(n_bytes: int) -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr("A001_capa.jpg", jpeg())
+        # preenchimento incompressível: só faz o ZIP passar do limite
+        zf.writestr("leiame.txt", os.urandom(n_bytes))
+    return buf.getvalue()
+
+
+def test_zip_acima_do_limite_de_upload_e_importado(app, admin, monkeypatch):
+    # limite geral de 1 MB; o ZIP tem 2 MB
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1 * MB)
+    monkeypatch.setattr(config, "UPLOAD_MAX_REQUEST_MB", 1)
+    monkeypatch.setattr(config, "IMPORT_MAX_REQUEST_MB", 8)
+    importer.importar([{"codigo": "A001", "tipo": "casa", "valor": "1", "bairro": "B",
+                        "descricao": "d", "status": "ativo"}])
+    dados = _zip_maior_que(2 * MB)
+    assert len(dados) > config.UPLOAD_MAX_REQUEST_MB * MB
+
+    r = admin.post(
+        "/admin/import",
+        data={"planilha": (io.BytesIO(dados), "fotos.zip")},
+        content_type="multipart/form-data",
+        headers={"Accept": "application/json"},
+    )
+    assert r.status_code == 202
+    job = r.get_json()
+    assert job["status"] == "concluido"
+    assert job["resultado"]["inseridos"] == 1
+    assert ImovelFoto.query.count() == 1
+
+
+def test_limite_geral_continua_valendo_fora_do_import(app, admin, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1 * MB)
+    monkeypatch.setattr(config, "IMPORT_MAX_REQUEST_MB", 8)
+
+    r = admin.post(
+        "/admin/save",
+        data={"codigo": "A1", "imagens": [(io.BytesIO(os.urandom(2 * MB)), "a.jpg")]},
+        content_type="multipart/form-data",
+    )
+    assert r.status_code == 413
+
+
+def test_import_sem_login_nao_ganha_o_limite_maior(app, monkeypatch, tmp_path):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1 * MB)
+    monkeypatch.setattr(config, "IMPORT_JOBS_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "IMPORT_MAX_REQUEST_MB", 8)
+
+    r = app.test_client().post(
+        "/admin/import",
+        data={"planilha": (io.BytesIO(_zip_maior_que(2 * MB)), "fotos.zip")},
+        content_type="multipart/form-data",
+    )
+    assert r.status_code in (302, 413)
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,205 @@
+# ============================================================
+# upload_pipeline.py
+# ------------------------------------------------------------
+# Processamento das fotos enviadas fora da thread da requisição.
+#
+#   admin_save → grava o original + linha ImovelFoto('processando')
+#              → copia o upload para UPLOAD_STAGING_DIR
+#              → enfileirar(foto_id, caminho)  (redirect imediato)
+#   pool de processos → image_pipeline.processar_upload(caminho)
+#   callback do future → só põe o resultado na fila _prontas
+#   thread finalizadora (uma por worker gunicorn) → finalizar(): grava
+#              o conteúdo normalizado + variantes e marca 'pronta'
+#   (o callback roda na thread interna do ProcessPoolExecutor: commit e
+#   cards ali travariam a coleta dos outros resultados)
+#
+# IMAGE_WORKERS=0 processa na hora (dev / sem multiprocessing).
+# Fotos presas em 'processando' (worker reiniciado) voltam para a fila
+# com `flask --app app fotos-reprocessar`.
+# ============================================================
+
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import catalog_version
+import config
+import image_pipeline
+import listing
+import photo_cache
+import photo_storage
+import search_index
+from models import db, ImovelFoto
+
+log = logging.getLogger(__name__)
+
+_app = None
+_pool = None
+_lock = threading.Lock()
+
+# (foto_id, caminho, future) prontos para finalizar
+_prontas = queue.Queue()
+_finalizador = None
+
+
+def init_app(app):
+    global _app
+    _app = app
+
+
+def _get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: os filhos não herdam conexões do pool SQLAlchemy
+            _pool = ProcessPoolExecutor(
+                max_workers=config.IMAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def stage(fh) -> str:
+    """Copia o upload (já em spool) para um arquivo que o pool consegue abrir."""
+    os.makedirs(config.UPLOAD_STAGING_DIR, exist_ok=True)
+    fd, caminho = tempfile.mkstemp(dir=config.UPLOAD_STAGING_DIR, prefix="up-")
+    fh.seek(0)
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(fh, out, photo_storage.CHUNK)
+    return caminho
+
+
+def enfileirar(foto_id: int, caminho: str):
+    if config.IMAGE_WORKERS <= 0:
+        finalizar(foto_id, caminho, image_pipeline.processar_upload(caminho))
+        return
+
+    try:
+        fut = _get_pool().submit(image_pipeline.processar_upload, caminho)
+    except Exception as e:
+        # pool quebrado (ex.: filho morto): recria na próxima
+        log.error(f"❌ Pool de imagens indisponível: {e}")
+        _reset_pool()
+        fut = _get_pool().submit(image_pipeline.processar_upload, caminho)
+
+    _iniciar_finalizador()
+    fut.add_done_callback(lambda f: _prontas.put((foto_id, caminho, f)))
+
+
+def _iniciar_finalizador():
+    global _finalizador
+    with _lock:
+        if _finalizador is None or not _finalizador.is_alive():
+            _finalizador = threading.Thread(target=_finalizar_prontas, name="fotos-finalizar", daemon=True)
+            _finalizador.start()
+
+
+def _finalizar_prontas():
+    while True:
+        foto_id, caminho, fut = _prontas.get()
+        try:
+            _on_done(foto_id, caminho, fut)
+        except Exception as e:
+            log.error(f"❌ Erro ao finalizar foto {foto_id}: {e}")
+        finally:
+            _prontas.task_done()
+
+
+def _on_done(foto_id, caminho, fut):
+    try:
+        resultado = fut.result()
+    except Exception as e:
+        resultado = {"erro": f"falha no processamento: {e}"}
+
+    with _app.app_context():
+        try:
+            finalizar(foto_id, caminho, resultado)
+        except Exception as e:
+            db.session.rollback()
+            log.error(f"❌ Erro ao finalizar foto {foto_id}: {e}")
+        finally:
+            db.session.remove()
+
+
+def finalizar(foto_id: int, caminho: str, resultado: dict):
+    """Grava o resultado do processamento na ImovelFoto (se ela ainda existir)."""
+    try:
+        foto = ImovelFoto.query.get(foto_id)
+        if foto is None:
+            return  # removida enquanto processava
+
+        if resultado.get("erro"):
+            foto.status = "erro"
+            db.session.commit()
+            log.warning(f"⚠️ Foto {foto_id}: {resultado['erro']}")
+            return
+
+        antigos = photo_storage.hashes_for(foto_id=foto_id)
+
+        foto.sha256 = None
+        foto.mimetype = resultado["mimetype"]
+        photo_storage.store(foto, resultado["conteudo"])
+        foto.variantes = []
+        image_pipeline.anexar_variantes(foto, resultado["variantes"])
+        foto.status = "pronta"
+        novo = foto.sha256
+        db.session.commit()
+
+        photo_storage.release(antigos)
+        photo_cache.cache.invalidate(h for h in antigos if h != novo)
+        _foto_visivel(foto.imovel_id)
+    finally:
+        try:
+            os.unlink(caminho)
+        except OSError:
+            pass
+
+
+def _foto_visivel(imovel_id):
+    """
+    A foto ficou 'pronta': capa e galeria públicas mudam, então o card
+    do imóvel é refeito e as páginas em cache precisam sair. O índice de
+    busca não depende das fotos e continua válido.
+    """
+    listing.atualizar_cards([imovel_id])
+    search_index.index.mark_version(catalog_version.bump())
+
+
+def reprocessar_pendentes(log=print) -> int:
+    """Reprocessa (na hora) as fotos que ficaram em 'processando'."""
+    feitas = 0
+    ids = [
+        r[0] for r in db.session.query(ImovelFoto.id)
+        .filter_by(status="processando")
+        .order_by(ImovelFoto.id)
+    ]
+    for foto_id in ids:
+        foto = ImovelFoto.query.get(foto_id)
+        conteudo = photo_storage.read(foto) if foto else None
+        if not conteudo:
+            continue
+
+        os.makedirs(config.UPLOAD_STAGING_DIR, exist_ok=True)
+        fd, caminho = tempfile.mkstemp(dir=config.UPLOAD_STAGING_DIR, prefix="up-")
+        with os.fdopen(fd, "wb") as out:
+            out.write(conteudo)
+        del conteudo
+
+        finalizar(foto_id, caminho, image_pipeline.processar_upload(caminho))
+        db.session.expunge_all()
+        feitas += 1
+        log(f"🖼️  Foto {foto_id} reprocessada")
+    return feitas